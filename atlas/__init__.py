@@ -1,6 +1,38 @@
-from .main import main_async
-from .audio_mixer import Mixer
-from .listener import Listener
-from .chat_context import Chat, Role
-from .openai_api_client import APIClient
-from .extension_router import ExtensionRouter
+import importlib
+from . import import_profile
+
+import_profile.install()
+
+# Exported names and the modules defining them, imported on first access so
+# that importing one part of atlas doesn't pull in pygame, speech_recognition and the rest
+_EXPORTS = {
+    "main_async": ".main",
+    "Mixer": ".audio_mixer",
+    "AudioClip": ".audio_clip",
+    "Listener": ".listener",
+    "SpeechEvent": ".listener",
+    "STTBackend": ".stt",
+    "GoogleSTTBackend": ".stt",
+    "LocalSTTBackend": ".stt",
+    "Chat": ".chat_context",
+    "Role": ".chat_context",
+    "APIClient": ".openai_api_client",
+    "ClipCache": ".tts_cache",
+    "AtlasExtension": ".extension_router",
+    "AsyncAtlasExtension": ".extension_router",
+    "ExtensionRouter": ".extension_router",
+    "HTTPClient": ".http_client",
+    "LazyExtension": ".extension_loader",
+    "discover_extensions": ".extension_loader",
+    "LatencyTracer": ".tracing",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
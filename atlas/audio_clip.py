@@ -0,0 +1,45 @@
+import io
+import os
+
+
+class AudioClip:
+    """
+    A synthesized speech clip. The audio is held in memory unless it was
+    spooled to disk because it was too large, in which case `path` is set.
+    """
+
+    def __init__(self, data=None, text=None, format="mp3", path=None):
+        self.data = data
+        self.text = text
+        self.format = format
+        self.path = path
+        # Monotonic times the clip was requested and its first byte arrived, unless it was cached
+        self.requested_at = None
+        self.first_byte_at = None
+        # Monotonic time playback of the clip started, once it has been scheduled
+        self.started_at = None
+
+    def __repr__(self):
+        source = self.path if self.path else f"{len(self.data or b'')} bytes"
+        return f"AudioClip({source}, text={self.text!r})"
+
+    def is_spooled(self):
+        return self.path is not None
+
+    def open(self):
+        """
+        Returns something pygame can load the clip from: the spool file path,
+        or a file object over the in-memory audio.
+        """
+        if self.path:
+            return self.path
+        return io.BytesIO(self.data)
+
+    def release(self):
+        """
+        Drops the audio once it has been played, deleting the spool file if any.
+        """
+        self.data = None
+        if self.path:
+            path, self.path = self.path, None
+            os.remove(path)
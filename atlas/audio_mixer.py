@@ -1,63 +1,159 @@
-import os
 import threading
 import time
+from collections import deque
 import pygame
 
+# Texts of played clips kept until they are taken
+SPOKEN_HISTORY_LENGTH = 256
+
+
 class Mixer:
     def __init__(self, logger):
         self.log = logger
-        self.queue = []
+        self.queue = deque()
+        # Clips handed to the channel: the one playing and at most one queued behind it
+        self.scheduled = deque()
+        self.condition = threading.Condition()
+        self.idle_event = threading.Event()
+        self.idle_event.set()
         self.stop_event = threading.Event()
+        # Times stop() was called, so a clip decoded meanwhile is dropped rather than played
+        self.stops = 0
+        self.channel = None
+        # Texts of the clips that have been heard, at least in part
+        self.spoken = deque(maxlen=SPOKEN_HISTORY_LENGTH)
 
     def init_mixer(self, log):
         try:
-            pygame.init()
+            # Only the mixer is needed, not the display, joystick and other subsystems
             pygame.mixer.init()
+            pygame.mixer.set_reserved(1)
+            self.channel = pygame.mixer.Channel(0)
             log.success("Mixer initialized.")
         except pygame.error as e:
             log.error(f"Mixer initialization failed: {e}")
 
     def add_clip(self, clip):
-        self.queue.append(clip)
+        with self.condition:
+            self.queue.append(clip)
+            self.idle_event.clear()
+            self.condition.notify()
         self.log.debug(f"Added clip: `{clip}`.")
 
     def start_auto_play_loop(self):
-        while not self.stop_event.is_set():
-            if self.queue:
-                clip = self.queue.pop(0)
-                self.play(clip)
-            else:
-                self.log.trace("Queue is empty, waiting...")
-                self.stop_event.wait(1)
+        with self.condition:
+            while not self.stop_event.is_set():
+                self._retire_finished_clips()
+
+                # Keep the channel's queue slot filled so the next clip starts without a gap
+                if self.queue and len(self.scheduled) < 2:
+                    clip = self.queue.popleft()
+                    stops = self.stops
+                    # Decoding takes a while, so add_clip isn't kept waiting on the lock meanwhile
+                    self.condition.release()
+                    try:
+                        sound = pygame.mixer.Sound(clip.open())
+                    finally:
+                        self.condition.acquire()
+                    if self.stop_event.is_set() or stops != self.stops:
+                        # Stopped while decoding, so the clip is no longer wanted
+                        self.release_clip(clip)
+                    else:
+                        self.play(clip, sound)
+                    continue
+
+                if self.scheduled:
+                    # Sleep until the current clip ends, unless a new clip arrives first
+                    _, _, ends_at = self.scheduled[0]
+                    timeout = ends_at - time.monotonic()
+                else:
+                    self.log.trace("Queue is empty, waiting...")
+                    self.idle_event.set()
+                    timeout = None
+                self.condition.wait(timeout)
+
+            self._release_all()
         self.log.debug("Thread stopped.")
 
     def stop_auto_play_loop(self):
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
         self.stop_event.set()
+        with self.condition:
+            self.condition.notify()
+        if self.channel:
+            self.channel.stop()
         self.log.debug("Stop event detected.")
 
-    def play(self, clip):
-        pygame.mixer.music.load(clip)
-        pygame.mixer.music.play()
-        self.log.debug(f"Playing clip: {clip}")
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.music.unload()
-        threading.Thread(target=self.delete_clip_from_disk, args=(clip,)).start()
+    def stop(self):
+        """
+        Silences playback at once and drops every clip waiting to play, e.g. when
+        the user interrupts. The auto play loop keeps running for the next clips.
+        """
+        with self.condition:
+            if self.channel:
+                self.channel.stop()
+            now = time.monotonic()
+            # The clip cut off mid-sentence was still heard in part
+            for clip, _, _ in self.scheduled:
+                if clip.started_at is not None and clip.started_at <= now:
+                    self.spoken.append(clip.text)
+            dropped = len(self.scheduled) + len(self.queue)
+            self._release_all()
+            self.stops += 1
+            self.idle_event.set()
+            self.condition.notify()
+        self.log.debug(f"Stopped playback, dropped {dropped} clips.")
+
+    def take_spoken_text(self):
+        """
+        Returns the text of every clip heard since the last call, and forgets it.
+        """
+        with self.condition:
+            text = " ".join(text for text in self.spoken if text)
+            self.spoken.clear()
+        return text
+
+    def play(self, clip, sound):
+        now = time.monotonic()
+        # The channel may still be finishing a retired clip, whose end is only an estimate
+        if self.channel.get_busy():
+            # Queued sounds start as soon as the current one ends, with no gap
+            self.channel.queue(sound)
+            starts_at = max(self.scheduled[-1][2], now) if self.scheduled else now
+            self.log.debug(f"Queued clip: {clip}")
+        else:
+            self.channel.play(sound)
+            starts_at = now
+            self.log.debug(f"Playing clip: {clip}")
+        clip.started_at = starts_at
+        self.scheduled.append((clip, sound, starts_at + sound.get_length()))
 
     def is_playing(self):
-        return pygame.mixer.music.get_busy() or self.queue
+        return not self.idle_event.is_set()
 
-    def wait_for_finish(self):
-        while self.is_playing():
-            self.log.trace(f"Waiting for playback to finish...")
-            time.sleep(1)
+    def wait_for_finish(self, timeout=None):
+        self.log.trace(f"Waiting for playback to finish...")
+        return self.idle_event.wait(timeout)
 
-    def delete_clip_from_disk(self, clip):
+    def release_clip(self, clip):
         try:
-            os.remove(clip)
-            self.log.debug(f"Deleted file: {clip}")
+            clip.release()
+            self.log.trace(f"Released clip: {clip}")
         except Exception as e:
-            self.log.error(f"Error deleting file {clip}: {e}")
+            self.log.error(f"Error releasing clip {clip}: {e}")
+
+    def _retire_finished_clips(self):
+        now = time.monotonic()
+        while self.scheduled:
+            clip, _, ends_at = self.scheduled[0]
+            if ends_at > now:
+                break
+            self.scheduled.popleft()
+            self.spoken.append(clip.text)
+            self.release_clip(clip)
+
+    def _release_all(self):
+        while self.scheduled:
+            clip, _, _ = self.scheduled.popleft()
+            self.release_clip(clip)
+        while self.queue:
+            self.release_clip(self.queue.popleft())
@@ -1,7 +1,20 @@
 import json, os, time
+from concurrent.futures import ThreadPoolExecutor
 
 CHAT_INITIATION_WORDS = ["atlas"]
 
+# Number of journaled messages loaded back into the context at startup
+HISTORY_TAIL_LENGTH = 200
+# Journal size in bytes that triggers a compaction, and how many messages compaction keeps
+JOURNAL_COMPACT_SIZE = 1024 * 1024
+JOURNAL_KEEP_LENGTH = 1000
+
+# Token budget for the messages sent with each completion request
+DEFAULT_TOKEN_BUDGET = 3000
+# Dropped messages that must build up before the rolling summary is refreshed
+SUMMARY_BATCH_LENGTH = 10
+SUMMARY__SYS_MSG = "Summarize the conversation below in a few sentences, keeping any facts, names and preferences the assistant should remember. Fold in the existing summary if there is one."
+
 
 class Role:
     ASSISTANT = "assistant"
@@ -10,33 +23,176 @@ class Role:
 
 
 class Chat:
-    def __init__(self, logger):
-        self.store_path = f"{os.path.dirname(os.path.abspath(__file__))}/chat_history.json"
+    def __init__(self, logger, journal_path=None, preload_path="context_preload"):
+        store_dir = os.path.dirname(os.path.abspath(__file__))
+        self.journal_path = journal_path or f"{store_dir}/chat_history.jsonl"
+        self.archive_path = f"{os.path.splitext(self.journal_path)[0]}.archive.jsonl"
+        self.legacy_store_path = f"{os.path.splitext(self.journal_path)[0]}.json"
         self.log = logger
-        CONTEXT_PRELOAD = self.get_context_preload()
-        self.context = self.load() or CONTEXT_PRELOAD
+        # A single writer thread keeps journal writes ordered and off the event loop
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-journal")
+        self.pending_write = None
+        CONTEXT_PRELOAD = self.get_context_preload(preload_path)
         self.context_preload_length = len(CONTEXT_PRELOAD)
-        
-    def save(self):
-        with open(self.store_path, 'w') as f:
-            json.dump(self.context, f, indent=4)
-        self.log.debug(f"Saved lists to {self.store_path}")
-
-    def load(self):
-        if os.path.exists(self.store_path):
-            with open(self.store_path, 'r') as f:
-                self.log.debug(f"Loaded chat history from {self.store_path}")
-                return json.load(f)
+        # Bytes journaled since the last compaction, or the whole journal before the first
+        self.journal_size = 0
+        self.context = CONTEXT_PRELOAD + self.load(CONTEXT_PRELOAD)
+
+        self.token_budget = int(os.environ.get("ATLAS__CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+        # Rolling summary of the messages before `summary_covers`, relative to the end of the preload
+        self.summary = None
+        self.summary_covers = 0
+        # First message that made it into the last request
+        self.window_start = 0
+
+    def load(self, preload):
+        if not os.path.exists(self.journal_path):
+            self._migrate_legacy_store(preload)
+
+        if os.path.exists(self.journal_path):
+            self.journal_size = os.path.getsize(self.journal_path)
+            lines = _read_tail_lines(self.journal_path, HISTORY_TAIL_LENGTH)
+            self.log.debug(f"Loaded last {len(lines)} messages from {self.journal_path}")
+            return [json.loads(line) for line in lines]
         else:
-            self.log.warning(f"Chat history file not found at {self.store_path}. Creating new chat history.")
-            
+            self.log.warning(f"Chat history file not found at {self.journal_path}. Creating new chat history.")
+            return []
+
+    def _migrate_legacy_store(self, preload):
+        # Chat history used to be rewritten in full to a JSON file, preload included
+        if not os.path.exists(self.legacy_store_path):
+            return
+        with open(self.legacy_store_path, 'r') as f:
+            history = json.load(f)
+        if history[:len(preload)] == preload:
+            history = history[len(preload):]
+        self._write_lines(self.journal_path, [json.dumps(msg) for msg in history], 'w')
+        self.log.info(f"Migrated {len(history)} messages from {self.legacy_store_path} to {self.journal_path}")
+
     def get_context(self):
         return self.context, len(self.context)
 
-    def add_msg(self, role, msg):
+    def add_msg(self, role, msg, ephemeral=False):
+        """
+        Adds a message to the context and journals it.
+        :param ephemeral: Only send the message with the current turn, e.g. for facts
+                          injected by an extension. It expires at the next user message.
+        """
         context = {"role": role, "content": msg}
+        if ephemeral:
+            context["ephemeral"] = True
         self.context.append(context)
-        self.save()
+        line = json.dumps(context)
+        self.journal_size += len(line) + 1
+        self.pending_write = self.writer.submit(self._write_lines, self.journal_path, [line], 'a')
+
+        if self.journal_size > JOURNAL_COMPACT_SIZE:
+            self.journal_size = 0
+            self.pending_write = self.writer.submit(self.compact)
+
+    def build_request(self, token_budget=None):
+        """
+        Builds the messages for a completion request under a token budget.
+        The preload and the current turn, i.e. the latest user message and any
+        messages added since, are always kept. Recent messages are included
+        verbatim as far as the budget allows, and older ones are represented by
+        the rolling summary if there is one.
+        :return: List of messages ready to send.
+        """
+        remaining = (token_budget or self.token_budget)
+        preload = self.context[:self.context_preload_length]
+        history = self.context[self.context_preload_length:]
+        remaining -= sum(estimate_tokens(msg) for msg in preload)
+
+        summary = None
+        if self.summary and self.summary_covers:
+            summary = {"role": Role.SYSTEM, "content": f"Summary of the earlier conversation: {self.summary}"}
+            remaining -= estimate_tokens(summary)
+
+        last_user_msg = max((i for i, msg in enumerate(history) if msg["role"] == Role.USER), default=-1)
+        # The current turn goes in whatever the budget, or the reply would miss the question
+        current_turn = last_user_msg if last_user_msg >= 0 else len(history)
+        window = [{"role": msg["role"], "content": msg["content"]} for msg in reversed(history[current_turn:])]
+        remaining -= sum(estimate_tokens(msg) for msg in window)
+        self.window_start = current_turn
+        for i in range(current_turn - 1, self.summary_covers - 1, -1):
+            msg = history[i]
+            # One-shot messages expire once the turn they were added for is over
+            if msg.get("ephemeral") and i < last_user_msg:
+                continue
+            remaining -= estimate_tokens(msg)
+            if remaining < 0:
+                break
+            window.append({"role": msg["role"], "content": msg["content"]})
+            self.window_start = i
+        window.reverse()
+
+        if self.window_start > self.summary_covers:
+            self.log.debug(f"Dropped {self.window_start - self.summary_covers} messages to fit the token budget.")
+
+        return preload + ([summary] if summary else []) + window
+
+    def build_summary_request(self):
+        """
+        Builds a request that folds the messages dropped from the last request into
+        the rolling summary, once enough of them have built up.
+        :return: Tuple of the messages to send and the position the summary will
+                 cover up to, or None if no refresh is due.
+        """
+        if self.window_start - self.summary_covers < SUMMARY_BATCH_LENGTH:
+            return None
+
+        history = self.context[self.context_preload_length:]
+        dropped = [
+            f"{msg['role']}: {msg['content']}"
+            for msg in history[self.summary_covers:self.window_start]
+            if not msg.get("ephemeral")
+        ]
+        existing = f"Existing summary: {self.summary}\n\n" if self.summary else ""
+        messages = [
+            {"role": Role.SYSTEM, "content": SUMMARY__SYS_MSG},
+            {"role": Role.USER, "content": existing + "\n".join(dropped)},
+        ]
+        return messages, self.window_start
+
+    def set_summary(self, summary, covers):
+        self.summary = summary
+        self.summary_covers = covers
+        self.log.debug(f"Updated rolling summary to cover {covers} messages.")
+
+    def compact(self):
+        """
+        Moves all but the most recent messages from the journal to the archive.
+        Runs on the writer thread, after every append submitted before it.
+        """
+        with open(self.journal_path, 'r') as f:
+            lines = f.read().splitlines()
+        archived, kept = lines[:-JOURNAL_KEEP_LENGTH], lines[-JOURNAL_KEEP_LENGTH:]
+        if not archived:
+            return
+        self._write_lines(self.archive_path, archived, 'a')
+
+        compacted_path = f"{self.journal_path}.compacting"
+        self._write_lines(compacted_path, kept, 'w')
+        os.replace(compacted_path, self.journal_path)
+        # journal_size was reset when this compaction was scheduled, so it only counts
+        # growth from here on. The kept messages alone may exceed JOURNAL_COMPACT_SIZE,
+        # and counting them would rewrite the journal on every message.
+        self.log.debug(f"Compacted chat history, archived {len(archived)} messages to {self.archive_path}")
+
+    def flush(self):
+        """
+        Blocks until every message added so far has been written.
+        """
+        if self.pending_write:
+            self.pending_write.result()
+
+    def close(self):
+        self.writer.shutdown(wait=True)
+
+    def _write_lines(self, path, lines, mode):
+        with open(path, mode) as f:
+            f.writelines(f"{line}\n" for line in lines)
 
     async def initiated(self, listener, loop):
         msg = await listener.listen_async(loop)
@@ -50,6 +206,7 @@ class Chat:
         return in_conversation, msg, start_time
 
     def get_context_preload(self, preload_path="context_preload"):
+        content = None
         try:
             with open(preload_path, "r") as file:
                 content = file.read()
@@ -72,6 +229,32 @@ class Chat:
         )
 
 
+def estimate_tokens(message):
+    """
+    Roughly estimates the tokens a message costs, at about four characters per
+    token plus the per-message overhead of the chat format.
+    """
+    return len(message["content"]) // 4 + 4
+
+
+def _read_tail_lines(path, count, block_size=8192):
+    """
+    Reads the last `count` lines of a file without reading the whole file.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    # The first line may be a fragment cut mid-character; it is dropped below
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return [line for line in lines[-count:] if line] if count else []
+
+
 def start_conversation_when(word_list, in_first, words_of):
     # Split the input string into words
     input_string = words_of
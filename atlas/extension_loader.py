@@ -0,0 +1,118 @@
+import asyncio
+import glob
+import importlib
+import json
+import os
+import threading
+from .extension_router import AsyncAtlasExtension, call_extension_handler
+
+EXTENSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extensions")
+
+
+def discover_extensions(logger, extensions_dir=EXTENSIONS_DIR, enabled=None):
+    """
+    Finds every extension with a manifest.json in the extensions directory,
+    without importing any of them.
+    :param enabled: Names of the extensions to load; defaults to ATLAS__EXTENSIONS
+                    (comma separated), or every extension found if that is unset.
+    :return: List of LazyExtension, in name order.
+    """
+    if enabled is None and os.environ.get("ATLAS__EXTENSIONS"):
+        enabled = [name.strip() for name in os.environ["ATLAS__EXTENSIONS"].split(",")]
+
+    extensions = []
+    for manifest_path in sorted(glob.glob(os.path.join(extensions_dir, "*", "manifest.json"))):
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if enabled is not None and manifest["name"] not in enabled:
+            continue
+        extensions.append(LazyExtension(logger, manifest))
+        logger.debug(f"Discovered extension: {manifest['name']} ({manifest_path})")
+    return extensions
+
+
+class LazyExtension(AsyncAtlasExtension):
+    """
+    Stands in for an extension described by a manifest. The router matches it on
+    the trigger phrases in the manifest, and the extension module, along with
+    everything it imports, is only loaded the first time input is routed to it.
+    """
+
+    def __init__(self, logger, manifest):
+        """
+        :param manifest: Dict with the extension's `name`, the `module` and `class`
+                         that implement it, and its `trigger_phrases`. An optional `prewarm`
+                         names the `url` of the host to connect to at startup, and the
+                         `url_env` environment variable that overrides it.
+        """
+        super().__init__()
+        self.log = logger
+        self.manifest = manifest
+        self.trigger_phrases = manifest.get("trigger_phrases", [])
+        self.extension = None
+        self.load_lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.manifest["class"]
+
+    def __repr__(self):
+        state = "loaded" if self.extension else "not loaded"
+        return f"LazyExtension({self.manifest['name']}, {state})"
+
+    def load(self):
+        """
+        Imports and constructs the extension, once.
+        """
+        with self.load_lock:
+            if self.extension is None:
+                module = importlib.import_module(self.manifest["module"])
+                extension = getattr(module, self.manifest["class"])(self.log)
+                if isinstance(extension, AsyncAtlasExtension):
+                    extension.http = self.http
+                self.extension = extension
+                self.log.debug(f"Loaded extension: {self.manifest['name']}")
+        return self.extension
+
+    async def load_async(self):
+        # Importing can take a while, so it happens off the event loop
+        if self.extension is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+        return self.extension
+
+    async def prewarm(self):
+        """
+        Opens a connection to the host in the manifest's `prewarm`, without
+        importing the extension.
+        """
+        prewarm = self.manifest.get("prewarm")
+        if not prewarm:
+            return
+        # The environment variable the extension itself reads the url from, if set, wins
+        url = os.environ.get(prewarm.get("url_env", "")) or prewarm.get("url")
+        if url:
+            await self.http.prewarm(url)
+
+    def can_handle_input(self, voice_input):
+        if self.trigger_phrases:
+            return super().can_handle_input(voice_input)
+        return self.load().can_handle_input(voice_input)
+
+    async def process_voice_input(self, voice_input):
+        extension = await self.load_async()
+        return await call_extension_handler(extension.process_voice_input, voice_input)
+
+    async def process_follow_up_input(self, follow_up_input):
+        extension = await self.load_async()
+        return await call_extension_handler(extension.process_follow_up_input, follow_up_input)
+
+    def start_conversation(self, context=None):
+        self.load().start_conversation(context)
+
+    def end_conversation(self):
+        if self.extension:
+            self.extension.end_conversation()
+
+    def is_in_conversation(self):
+        return bool(self.extension and self.extension.is_in_conversation())
+
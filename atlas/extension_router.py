@@ -1,13 +1,64 @@
+import asyncio
+import inspect
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from .http_client import HTTPClient
+from .intent_index import IntentIndex, normalize_phrase
+
+# Number of recent routing decisions kept by the router
+ROUTING_CACHE_SIZE = 128
+
+
+async def call_extension_handler(handler, argument):
+    """
+    Awaits an asynchronous extension handler, or runs a synchronous one in the
+    default executor so its blocking calls never hold up the event loop.
+    """
+    if inspect.iscoroutinefunction(handler):
+        return await handler(argument)
+    return await asyncio.get_running_loop().run_in_executor(None, handler, argument)
+
+
+class DirectResponse:
+    """
+    A reply that is spoken to the user as-is, skipping the chat completion.
+    Returned by extensions whose replies are deterministic.
+    """
+
+    def __init__(self, template, **slots):
+        """
+        :param template: The reply, with `str.format` placeholders for the slots.
+        :param slots: Values for the placeholders in the template.
+        """
+        self.template = template
+        self.slots = slots
+        self.text = template.format(**slots)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"DirectResponse({self.text!r})"
 
 
 class AtlasExtension(ABC):
+    # Keywords and phrases that route input to this extension. A phrase scores its
+    # word count by default; use a dict of phrase to score to weight them explicitly.
+    trigger_phrases = []
+
     def __init__(self):
         # Flag to indicate if the extension is in a conversation
         self.in_conversation = False
         # Dictionary to store context relevant to the current conversation
         self.conversation_context = {}
 
+    @property
+    def name(self):
+        """
+        The name the user knows the extension by, e.g. when asked which one they meant.
+        """
+        return self.__class__.__name__
+
     def start_conversation(self, context=None):
         """
         Start a conversation with the user.
@@ -29,15 +80,16 @@ class AtlasExtension(ABC):
         """
         return self.in_conversation
 
-    @abstractmethod
     def can_handle_input(self, voice_input):
         """
         Determines if the extension can handle the given input.
-        This method must be implemented by the subclass.
+        The router matches `trigger_phrases` itself; this method is only consulted
+        for extensions that do not declare any, which must then override it.
         :param voice_input: The voice input to check.
         :return: Boolean indicating if the extension can handle the input.
         """
-        pass
+        normalized = normalize_phrase(voice_input)
+        return any(normalize_phrase(phrase) in normalized for phrase in self.trigger_phrases)
 
     @abstractmethod
     def process_voice_input(self, voice_input):
@@ -45,6 +97,8 @@ class AtlasExtension(ABC):
         Process the initial voice input received from the user.
         This method must be implemented by the subclass.
         :param voice_input: The voice input to process.
+        :return: A system message for the assistant, a DirectResponse to speak
+                 as-is, or None if the input was not handled.
         """
         pass
 
@@ -56,6 +110,15 @@ class AtlasExtension(ABC):
         """
         pass
     
+    def prewarm(self):
+        """
+        Opens connections to the services the extension uses, ahead of the first
+        request. Called in the background at startup; may be a coroutine function.
+        Extensions discovered from a manifest are pre-warmed from its `prewarm`
+        entry instead, so they aren't imported to do it.
+        """
+        pass
+
     def request_further_context(self, system_msg, start_conversation=True, context=None):
         """
         Request additional context from the user and start a conversation.
@@ -68,55 +131,183 @@ class AtlasExtension(ABC):
         return system_msg
 
 
+class AsyncAtlasExtension(AtlasExtension):
+    """
+    An extension whose handlers are coroutines, awaited by the router on the
+    event loop. Handlers must never block; make HTTP requests through `self.http`,
+    the pooled client the router shares between extensions.
+    """
+    http = None
+
+    @abstractmethod
+    async def process_voice_input(self, voice_input):
+        """
+        Process the initial voice input received from the user.
+        This method must be implemented by the subclass.
+        :param voice_input: The voice input to process.
+        :return: A system message for the assistant, a DirectResponse to speak
+                 as-is, or None if the input was not handled.
+        """
+        pass
+
+    async def process_follow_up_input(self, follow_up_input):
+        """
+        Process a follow-up input during a conversation.
+        This method should be overridden by the subclass if it requires handling follow-up conversations.
+        :param follow_up_input: The follow-up input to process.
+        """
+        pass
+
+
 class ExtensionRouter:
-    def __init__(self, logger):
+    def __init__(self, logger, http_client=None):
         self.log = logger
+        self.http = http_client or HTTPClient(logger)
         self.extensions = []
         self.active_conversation_extension = None
         self.pending_disambiguation = None
+        self.intent_index = None
+        self.routing_cache = OrderedDict()
         
     def add_extension(self, service):
         if not isinstance(service, AtlasExtension):
             raise TypeError("Service must be an instance of AtlasExtension")
+        if isinstance(service, AsyncAtlasExtension):
+            service.http = self.http
         self.extensions.append(service)
+        # Recompiled on the next routing decision
+        self.intent_index = None
+        self.routing_cache.clear()
         self.log.debug(f"Added extension: {service.__class__.__name__}")
+
+    def _compile_intent_index(self):
+        self.intent_index = IntentIndex()
+        for extension in self.extensions:
+            phrases = extension.trigger_phrases
+            weights = phrases if isinstance(phrases, dict) else dict.fromkeys(phrases)
+            for phrase, weight in weights.items():
+                self.intent_index.add(phrase, extension, weight)
+        self.intent_index.compile()
+
+    def score_extensions(self, voice_input):
+        """
+        Scores every extension against the input in a single pass over it.
+        :param voice_input: The voice input to score.
+        :return: List of (extension, score) tuples, highest score first.
+        """
+        if self.intent_index is None:
+            self._compile_intent_index()
+
+        scores = self.intent_index.search(voice_input)
+        # Extensions without trigger phrases still decide for themselves
+        for extension in self.extensions:
+            if not extension.trigger_phrases and extension.can_handle_input(voice_input):
+                scores[extension] = scores.get(extension, 0) + 1
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def match_extensions(self, voice_input):
+        """
+        Returns the extensions with the highest score for the input. Recent
+        decisions are cached, keyed on the normalized input.
+        """
+        key = normalize_phrase(voice_input)
+        if key in self.routing_cache:
+            self.routing_cache.move_to_end(key)
+            return self.routing_cache[key]
+
+        scored = self.score_extensions(voice_input)
+        matching_extensions = [extension for extension, score in scored if score == scored[0][1]] if scored else []
+
+        self.routing_cache[key] = matching_extensions
+        if len(self.routing_cache) > ROUTING_CACHE_SIZE:
+            self.routing_cache.popitem(last=False)
+        return matching_extensions
     
     def route_voice_input(self, voice_input):
+        """
+        Routes the input to an extension and returns its response. Only for
+        synchronous extensions; use `route_voice_input_async` on the event loop.
+        """
+        handler, argument, extension = self._dispatch(voice_input)
+        if handler is None:
+            return argument
+        if inspect.iscoroutinefunction(handler):
+            raise TypeError(f"{handler.__qualname__} is a coroutine; route the input with route_voice_input_async")
+        return self._conclude(extension, handler(argument))
+
+    async def route_voice_input_async(self, voice_input):
+        """
+        Routes the input to an extension and returns its response. Asynchronous
+        extensions are awaited; synchronous ones run in the default executor so
+        their blocking calls never hold up the event loop.
+        """
+        handler, argument, extension = self._dispatch(voice_input)
+        if handler is None:
+            return argument
+        response = await call_extension_handler(handler, argument)
+        return self._conclude(extension, response)
+
+    def handle_voice_input(self, voice_input):
+        return self.route_voice_input(voice_input)
+
+    async def handle_voice_input_async(self, voice_input):
+        return await self.route_voice_input_async(voice_input)
+
+    async def close(self):
+        await self.http.close()
+
+    def _dispatch(self, voice_input):
+        """
+        Decides which extension handler the input goes to, without calling it.
+        :return: Tuple of the handler, its argument, and the matched extension if
+                 its response decides the active conversation. The handler is None
+                 when the router answers itself, with the answer as the argument.
+        """
         # If there is an active conversation, route input to that extension for follow-up processing
         if self.active_conversation_extension and self.active_conversation_extension.is_in_conversation():
-            return self.active_conversation_extension.process_follow_up_input(voice_input)
+            return self.active_conversation_extension.process_follow_up_input, voice_input, None
 
         if self.pending_disambiguation is not None:
-            return self.handle_follow_up(voice_input)
+            extension, original_input = self._resolve_disambiguation(voice_input)
+            if extension is None:
+                return None, original_input, None
+            return extension.process_voice_input, original_input, None
+
+        # If no active conversation, find the best matching extensions.
+        matching_extensions = self.match_extensions(voice_input)
 
-        # If no active conversation, check each extension for potential matches.
-        matching_extensions = [extension for extension in self.extensions if extension.can_handle_input(voice_input)]
-                    
         if len(matching_extensions) > 1:
             # Ambiguity detected, ask for clarification
             self.log.debug(f"Detected ambiguity. Multiple extensions matched input: {voice_input} {matching_extensions}")
-            return self.disambiguate_intent(voice_input, matching_extensions)
+            return None, self.disambiguate_intent(voice_input, matching_extensions), None
 
         if matching_extensions:
             self.log.debug(f"Detected matching extension: {matching_extensions[0]}. Processing input: {voice_input}")
-            response = matching_extensions[0].process_voice_input(voice_input)
-                    
-            if response:
-                # If the extension starts a conversation, set it as active
-                if matching_extensions[0].is_in_conversation():
-                    self.active_conversation_extension = matching_extensions[0]
-                return response
+            return matching_extensions[0].process_voice_input, voice_input, matching_extensions[0]
+
+        self._end_active_conversation()
+        return None, None, None
+
+    def _conclude(self, extension, response):
+        if extension is None:
+            return response
+
+        if response:
+            # If the extension starts a conversation, set it as active
+            if extension.is_in_conversation():
+                self.active_conversation_extension = extension
+            return response
 
         # End the active conversation if no extension responds
+        self._end_active_conversation()
+        return None
+
+    def _end_active_conversation(self):
         if self.active_conversation_extension:
             self.active_conversation_extension.end_conversation()
             self.active_conversation_extension = None
 
-        return None
-
-    def handle_voice_input(self, voice_input):
-        return self.route_voice_input(voice_input)
-    
     def disambiguate_intent(self, voice_input, matching_extensions):
         """
         Ask the user to clarify their intent when multiple extensions match the input.
@@ -131,7 +322,7 @@ class ExtensionRouter:
         }
 
         # Generate a prompt based on the types of extensions that matched
-        extension_types = [ext.__class__.__name__ for ext in matching_extensions]
+        extension_types = [ext.name for ext in matching_extensions]
         prompt = "Did you mean a " + " or a ".join(extension_types) + "?"
         return prompt
     
@@ -141,16 +332,29 @@ class ExtensionRouter:
         :param user_response: The user's response to the clarification prompt.
         :return: The response from the appropriate extension.
         """
+        extension, original_input = self._resolve_disambiguation(user_response)
+        if extension is None:
+            return original_input
+        return extension.process_voice_input(original_input)
+
+    def _resolve_disambiguation(self, user_response):
+        """
+        Picks the extension the user meant from their response to the disambiguation prompt.
+        :return: Tuple of the extension and the original input, or of None and a
+                 prompt for the user if it is still unclear.
+        """
         if not self.pending_disambiguation:
-            return "I'm not sure what you're referring to."
+            return None, "I'm not sure what you're referring to."
+
+        # Clear the pending disambiguation as it's no longer needed
+        original_input = self.pending_disambiguation["original_input"]
+        candidates = self.pending_disambiguation["matching_extensions"]
+        self.pending_disambiguation = None
 
         # Determine which extension to use based on the user's response
-        for extension in self.pending_disambiguation["matching_extensions"]:
-            if extension.keyword_in_response(user_response):
-                # Clear the pending disambiguation as it's no longer needed
-                self.pending_disambiguation = None
-                return extension.process_voice_input(self.pending_disambiguation["original_input"])
+        for extension, _ in self.score_extensions(user_response):
+            if extension in candidates:
+                return extension, original_input
 
-        # If none match, clear the disambiguation and ask for more clarity
-        self.pending_disambiguation = None
-        return "I'm still not sure what you meant. Could you please specify if it's a movie, game, or something else?"
\ No newline at end of file
+        # If none match, ask for more clarity
+        return None, "I'm still not sure what you meant. Could you please specify if it's a movie, game, or something else?"
@@ -1,64 +1,51 @@
-import re
+from atlas.grammar import GrammarEngine
+
+# Registered once at load time and compiled on first use
+GRAMMAR = (
+    GrammarEngine()
+    .register('read', r"\b(?:read(?: out)?|what is (?:on|in)|tell me what is (?:on|in)) (?:me )?the (?P<list>.*?) list")
+    .register('add', r"\badd (?P<item>.*?) to (?:the |my )?(?P<list>.*?) list")
+    .register('remove', r"\bremove (?P<item>.*?) from (?:the |my )?(?P<list>.*?) list")
+    .register('create', r"\bcreate(?: me)? a(?: new)? (?:list called )?['\"]?(?P<list>[^'\"]+?)['\"]?(?: list)?(?=\?| for me|$)")
+    .register('create', r"\bcreate the list ['\"]?(?P<list>[^'\"]+)['\"]?")
+    .register('delete', r"\bdelete(?: the)?(?: list called)? ['\"]?(?P<list>[^'\"]+?)['\"]?(?: list)?(?=\?|$)")
+)
+
+# Actions that delete something, and so never act on an approximate match without confirmation
+DESTRUCTIVE_ACTIONS = ('remove', 'delete')
 
 
 class Context:
-    def __init__(self, logger):
+    def __init__(self, logger, list_index=None):
         self.log = logger
+        # Index of the existing list names, to resolve the list the user meant
+        self.list_index = list_index
         self.voice_input = None
         self.action = None
         self.item = None
         self.list = None
+        # Existing list that approximately matches the one named, for a destructive action to confirm
+        self.list_candidate = None
 
     def extract_from_input(self, voice_input):
         self.voice_input = voice_input
-        
-        intent_to_read_regex = re.compile(r"(read(?: out)?|what is (?:on|in)|tell me what is (?:on|in)) (?:me )?the (.*?) list", re.IGNORECASE)
-        intent_to_read = intent_to_read_regex.search(self.voice_input)
-        if intent_to_read:
-            self.action = 'read'
-            self.list = intent_to_read.group(2)
-            return
-        
-        extraction_methods = {
-            'add': self._extract_add_context,
-            'remove': self._extract_remove_context,
-            'create': self._extract_create_context,
-            'delete': self._extract_delete_context,
-        }
-            
-        words = voice_input.split()
-        
-        for action_key in extraction_methods:
-            if action_key in words:
-                self.action = action_key
-                self.log.debug(f"Extracting context for action: {action_key}")
-                extraction_methods[action_key]()
-        
 
-    def _extract_add_context(self):
-        regex = re.compile(r"add (.*?) to (?:the |my )?(.*?) list", re.IGNORECASE)
-        match = regex.search(self.voice_input)
-        self.item, self.list = (match.groups() if match else (None, None))
-
-    def _extract_remove_context(self):
-        regex =  re.compile(r"remove (.*?) from (?:the |my )?(.*?) list", re.IGNORECASE)
-        match = regex.search(self.voice_input)
-        self.item, self.list = (match.groups() if match else (None, None))
+        action, slots = GRAMMAR.match(voice_input)
+        if not action:
+            self.log.error(f"Unable to match '{self.voice_input}' against the list grammars.")
+            return
 
-    def _extract_create_context(self):
-        first_pattern = re.compile(r"create(?: me)? a(?: new)? (?:list called )?['\"]?([^'\"]+?)['\"]?(?: list)?(?=\?| for me|$)", re.IGNORECASE)
-        second_pattern = re.compile(r"create the list ['\"]?([^'\"]+)['\"]?", re.IGNORECASE)
-        match = first_pattern.search(self.voice_input)
-        self.log.debug(f"Match 1: {match}")
-        if not match:
-            match = second_pattern.search(self.voice_input)
-            self.log.debug(f"Match 2: {match}")
-        if not match:
-            self.log.error(f"Unable to match '{self.voice_input}' against regex.")
-        self.list = match.group(1) if match else None
+        self.log.debug(f"Extracted context for action: {action} {slots}")
+        self.action = action
+        self.item = slots.get('item')
+        self.list = slots.get('list')
 
-    def _extract_delete_context(self):
-        regex = re.compile(r"delete(?: the)?(?: list called)? ['\"]?([^'\"]+?)['\"]?(?: list)?(?=\?|$)", re.IGNORECASE)
-        match = regex.search(self.voice_input)
-        
-        self.list = match.group(1) if match else None
\ No newline at end of file
+        # A new list is named as said; otherwise refer to the existing list, e.g. "Shopping." to "shopping"
+        if self.list and self.list_index is not None and action != 'create':
+            exact = self.list_index.get(self.list)
+            if exact is not None:
+                self.list = exact
+            elif action in DESTRUCTIVE_ACTIONS:
+                self.list_candidate = self.list_index.closest(self.list)
+            else:
+                self.list = self.list_index.closest(self.list) or self.list
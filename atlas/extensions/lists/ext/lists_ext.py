@@ -1,32 +1,39 @@
-from atlas.extension_router import AtlasExtension
+import re
+from atlas.extension_router import AtlasExtension, DirectResponse
 from .lists_ctx import Context
-from .lists_store import Store
+from .lists_index import ItemIndex
+from .lists_store import open_store
 
 
-ITEM_NOT_FOUND__SYS_MSG = "Tell the user that the item is not found in list. Do not respond with anything else."
-LIST_NOT_FOUND__SYS_MSG = "Tell the user that the list was not found. Do not respond with anything else."
-LIST_ALREADY_EXISTS__SYS_MSG = "Tell the user that the list already exists. Do not respond with anything else."
-LIST_CREATED__SYS_MSG = "Tell the user that the list has been created. Do not respond with anything else."
-LIST_REMOVED__SYS_MSG = "Tell the user that the list has been removed. Do not respond with anything else."
-ITEM_ADDED__SYS_MSG = "Tell the user that the item has been added to the list. Do not respond with anything else."
-ITEM_REMOVED__SYS_MSG = "Tell the user that the item has been removed from the list. Do not respond with anything else."
+ITEM_NOT_FOUND__RESPONSE = "I couldn't find {item} on the {list} list."
+LIST_NOT_FOUND__RESPONSE = "You don't have a {list} list."
+LIST_ALREADY_EXISTS__RESPONSE = "You already have a {list} list."
+LIST_CREATED__RESPONSE = "I've created the {list} list."
+LIST_REMOVED__RESPONSE = "I've deleted the {list} list."
+ITEM_ADDED__RESPONSE = "I've added {item} to the {list} list."
+ITEM_REMOVED__RESPONSE = "I've removed {item} from the {list} list."
+LIST_EMPTY__RESPONSE = "The {list} list is empty."
+LIST_ITEMS__RESPONSE = "On the {list} list you have {items}."
+CONFIRM_ITEM__RESPONSE = "I couldn't find {item} on the {list} list. Did you mean {candidate}?"
+CONFIRM_LIST__RESPONSE = "You don't have a {list} list. Did you mean the {candidate} list?"
+NOT_CONFIRMED__RESPONSE = "Okay, I've left it as it is."
+
+CONFIRMATION_WORDS = {'yes', 'yeah', 'yep', 'sure', 'correct', 'ok', 'okay', 'please'}
+DENIAL_WORDS = {'no', 'nope', 'not', "don't", 'dont'}
 
 class ListExtension(AtlasExtension):
-    def __init__(self, logger):
+    trigger_phrases = ['list', 'lists']
+
+    def __init__(self, logger, store=None):
         super().__init__()
         self.log = logger
-        self.store = Store(logger) # loads on initialization, but can also be called with self.store.load()
+        self.store = store if store is not None else open_store(logger)
         self.context = Context(logger)
         self.conversation_state = {}
 
-    """
-    Used by the extension router to determine whether this extension can handle 
-    the given voice input. 
-    """  
-    def can_handle_input(self, voice_input):
-        return any(word in voice_input for word in ['list', 'lists'])
-
     def process_voice_input(self, voice_input):
+        # Indexed afresh from the store, which another instance or process may have changed
+        self.context.list_index = ItemIndex(self.store.list_names())
         self.context.extract_from_input(voice_input)
 
         if not self.context.action:
@@ -38,11 +45,15 @@ class ListExtension(AtlasExtension):
         if not self.context.item and self.context.action in ['add', 'remove']:
             raise ValueError("No item found in context.")
         
+        if self.context.list_candidate:
+            # Only delete what the user named exactly, or confirmed
+            pending = {'action': self.context.action, 'list': self.context.list_candidate, 'item': self.context.item}
+            response = DirectResponse(CONFIRM_LIST__RESPONSE, list=self.context.list, candidate=self.context.list_candidate)
+            self.context = Context(self.log)
+            return self.request_further_context(response, context=pending)
+
         if self.context.action == 'read':
-            if self.context.list in self.store.lists:
-                return f"Read back the user the items in the list: {self.store.lists[self.context.list]}"
-            else:
-                return f"Tell the user they don't have a '{self.context.list}' list."
+            return self.read_list(self.context.list)
         
         if self.context.action:
             self.log.debug(f"Handling context: {self.context.__dict__}")
@@ -51,7 +62,14 @@ class ListExtension(AtlasExtension):
             return SYS_MSG
             
     def process_follow_up_input(self, follow_up_input):
-        pass
+        # The answer to a confirmation of an approximate match
+        pending = self.conversation_context
+        self.end_conversation()
+        if not _is_confirmation(follow_up_input):
+            return DirectResponse(NOT_CONFIRMED__RESPONSE)
+        if pending['action'] == 'remove':
+            return self.remove_item(pending['list'], pending['item'])
+        return self.remove_list(pending['list'])
 
     def _handle_request(self):
         if self.context.action == 'add': 
@@ -67,38 +85,51 @@ class ListExtension(AtlasExtension):
             return self.remove_list(self.context.list)
         
              
+    def read_list(self, list):
+        items = self.store.get_items(list)
+        if items is None:
+            return DirectResponse(LIST_NOT_FOUND__RESPONSE, list=list)
+        if not items:
+            return DirectResponse(LIST_EMPTY__RESPONSE, list=list)
+        spoken_items = items[0] if len(items) == 1 else f"{', '.join(items[:-1])} and {items[-1]}"
+        return DirectResponse(LIST_ITEMS__RESPONSE, list=list, items=spoken_items)
+
     def add_item(self, list, item):
-        if list in self.store.lists:
-            self.store.lists[list].append(item)
-            self.store.save()
-            return ITEM_ADDED__SYS_MSG
+        if self.store.add_item(list, item):
+            return DirectResponse(ITEM_ADDED__RESPONSE, list=list, item=item)
         else:
-            return LIST_NOT_FOUND__SYS_MSG
-
+            return DirectResponse(LIST_NOT_FOUND__RESPONSE, list=list)
 
     def remove_item(self, list, item):
-        if list in self.store.lists:
-            if item in self.store.lists[list]:
-                self.store.lists[list].remove(item)
-                self.store.save()
-                return ITEM_REMOVED__SYS_MSG
-            else:
-                return ITEM_NOT_FOUND__SYS_MSG
-        else:
-            return LIST_NOT_FOUND__SYS_MSG
+        with self.store.transaction():
+            if not self.store.has_list(list):
+                return DirectResponse(LIST_NOT_FOUND__RESPONSE, list=list)
+            # Match "Milk." or "milks" to the "milk" on the list, as stored right now
+            index = ItemIndex(self.store.get_items(list) or [])
+            stored_item = index.get(item)
+            if stored_item is not None and self.store.remove_item(list, stored_item):
+                return DirectResponse(ITEM_REMOVED__RESPONSE, list=list, item=stored_item)
+
+            # A near miss, e.g. "oat milk" for "milk", may well be a different item, so ask first
+            candidate = index.closest(item)
+            if candidate is not None:
+                response = DirectResponse(CONFIRM_ITEM__RESPONSE, list=list, item=item, candidate=candidate)
+                return self.request_further_context(response, context={'action': 'remove', 'list': list, 'item': candidate})
+            return DirectResponse(ITEM_NOT_FOUND__RESPONSE, list=list, item=item)
 
     def create_list(self, list):
-        if list in self.store.lists:
-            return LIST_ALREADY_EXISTS__SYS_MSG
+        if self.store.create_list(list):
+            return DirectResponse(LIST_CREATED__RESPONSE, list=list)
         else:
-            self.store.lists[list] = []
-            self.store.save()
-            return LIST_CREATED__SYS_MSG
+            return DirectResponse(LIST_ALREADY_EXISTS__RESPONSE, list=list)
 
     def remove_list(self, list):
-        if list in self.store.lists:
-            del self.store.lists[list]
-            self.store.save()
-            return LIST_REMOVED__SYS_MSG
+        if self.store.remove_list(list):
+            return DirectResponse(LIST_REMOVED__RESPONSE, list=list)
         else:
-            return LIST_NOT_FOUND__SYS_MSG
\ No newline at end of file
+            return DirectResponse(LIST_NOT_FOUND__RESPONSE, list=list)
+
+
+def _is_confirmation(answer):
+    words = set(re.findall(r"[a-z']+", answer.lower()))
+    return bool(words & CONFIRMATION_WORDS) and not words & DENIAL_WORDS
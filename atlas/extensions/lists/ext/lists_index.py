@@ -0,0 +1,109 @@
+import re
+
+NON_WORD = re.compile(r"[^a-z0-9\s]+")
+# Minimum trigram similarity for an approximate match, between 0 and 1
+MIN_SIMILARITY = 0.5
+
+
+def normalize_key(text):
+    """
+    Reduces a transcribed item or list name to a lookup key, so that "Milk",
+    "milk." and "milks" all index the same entry.
+    """
+    words = NON_WORD.sub('', text.lower()).split()
+    return ' '.join(_singular(word) for word in words)
+
+
+def _singular(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ItemIndex:
+    """
+    Index over the entries of a list, by normalized key. Exact lookups are a
+    single dict access; near misses are found through a trigram index, which
+    only ever compares against entries sharing a trigram with the query.
+    """
+
+    def __init__(self, items=(), min_similarity=MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        # Key -> the entries stored under it, as originally written
+        self.entries = {}
+        # Trigram -> keys containing it
+        self.postings = {}
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, text):
+        return normalize_key(text) in self.entries
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.entries.values())
+
+    def add(self, item):
+        key = normalize_key(item)
+        if key not in self.entries:
+            self.entries[key] = []
+            for trigram in _trigrams(key):
+                self.postings.setdefault(trigram, set()).add(key)
+        self.entries[key].append(item)
+
+    def remove(self, item):
+        """
+        Removes one entry stored under the item's key.
+        """
+        key = normalize_key(item)
+        entries = self.entries.get(key)
+        if not entries:
+            return
+        entries.remove(item if item in entries else entries[0])
+        if not entries:
+            del self.entries[key]
+            for trigram in _trigrams(key):
+                self.postings[trigram].discard(key)
+                if not self.postings[trigram]:
+                    del self.postings[trigram]
+
+    def get(self, text):
+        """
+        Finds the entry with the same normalized key as the text.
+        :return: The entry as originally written, or None.
+        """
+        entries = self.entries.get(normalize_key(text))
+        return entries[0] if entries else None
+
+    def closest(self, text):
+        """
+        Finds the entry most similar to the text, by the Dice coefficient of their trigrams.
+        :return: The entry as originally written, or None if nothing is similar enough.
+        """
+        query = _trigrams(normalize_key(text))
+        shared = {}
+        for trigram in query:
+            for key in self.postings.get(trigram, ()):
+                shared[key] = shared.get(key, 0) + 1
+
+        best, best_similarity = None, self.min_similarity
+        for key, count in shared.items():
+            similarity = 2 * count / (len(query) + len(_trigrams(key)))
+            if similarity >= best_similarity:
+                best, best_similarity = key, similarity
+        return self.entries[best][0] if best is not None else None
+
+    def resolve(self, text):
+        """
+        Finds the entry the text refers to, exactly if possible, otherwise approximately.
+        :return: The entry as originally written, or None.
+        """
+        return self.get(text) or self.closest(text)
@@ -1,14 +1,40 @@
 import os
 import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+STORE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Seconds a write waits for another process to release the database
+SQLITE_BUSY_TIMEOUT = 5
+# Schema version recorded in the database once it has been created and migrated
+SQLITE_SCHEMA_VERSION = 1
+
+
+def open_store(logger):
+    """
+    Opens the store backend selected by LISTS_EXT__STORE, either 'json' (the default) or 'sqlite'.
+    """
+    backend = os.environ.get('LISTS_EXT__STORE', 'json').lower()
+    if backend == 'sqlite':
+        return SQLiteStore(logger)
+    if backend != 'json':
+        logger.warning(f"Unknown lists store '{backend}'. Using the JSON store.")
+    return Store(logger)
+
 
 class Store:
     def __init__(self, logger, store_file_name='store.json'):
         self.log = logger
-        self.store_path = f'{os.path.dirname(os.path.abspath(__file__))}/{store_file_name}'
+        self.store_path = os.path.join(STORE_DIR, store_file_name)
         self.lists = {}
+        self.transaction_depth = 0
         self.load()
 
     def save(self):
+        # Saved once, at the end of the outermost transaction
+        if self.transaction_depth:
+            return
         with open(self.store_path, 'w') as f:
             json.dump(self.lists, f, indent=4)
         self.log.debug(f"Saved lists to {self.store_path}")
@@ -19,4 +45,174 @@ class Store:
                 self.log.debug(f"Loaded lists from {self.store_path}")
                 self.lists = json.load(f)
         else:
-            self.log.warning(f"Store file not found at {self.store_path}. Creating new store.")
\ No newline at end of file
+            self.log.warning(f"Store file not found at {self.store_path}. Creating new store.")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Batches every change made inside the block into a single save.
+        """
+        self.transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self.transaction_depth -= 1
+        self.save()
+
+    def list_names(self):
+        return list(self.lists)
+
+    def has_list(self, list):
+        return list in self.lists
+
+    def get_items(self, list):
+        items = self.lists.get(list)
+        return items[:] if items is not None else None
+
+    def create_list(self, list):
+        if list in self.lists:
+            return False
+        self.lists[list] = []
+        self.save()
+        return True
+
+    def remove_list(self, list):
+        if list not in self.lists:
+            return False
+        del self.lists[list]
+        self.save()
+        return True
+
+    def add_item(self, list, item):
+        if list not in self.lists:
+            return False
+        self.lists[list].append(item)
+        self.save()
+        return True
+
+    def remove_item(self, list, item):
+        if item not in self.lists.get(list, []):
+            return False
+        self.lists[list].remove(item)
+        self.save()
+        return True
+
+    def close(self):
+        pass
+
+
+class SQLiteStore:
+    """
+    Lists stored in SQLite, one row per item, so each change writes only the
+    rows it touches. The database runs in WAL mode, so several processes can
+    share it and readers never wait on a writer.
+    """
+
+    def __init__(self, logger, db_file_name='store.db', json_file_name='store.json'):
+        self.log = logger
+        self.db_path = os.path.join(STORE_DIR, db_file_name)
+        self.json_path = os.path.join(STORE_DIR, json_file_name)
+        # Extensions are called from executor threads, so the connection is shared under a lock
+        self.lock = threading.RLock()
+        self.transaction_depth = 0
+        self.connection = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self.transaction():
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SQLITE_SCHEMA_VERSION:
+                return
+            # Not executescript, which would commit the open transaction
+            self.connection.execute("CREATE TABLE IF NOT EXISTS lists (name TEXT PRIMARY KEY)")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    list_name TEXT NOT NULL REFERENCES lists(name) ON DELETE CASCADE,
+                    item TEXT NOT NULL
+                )
+            """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS items_list_name ON items(list_name, item)")
+            self._migrate_json_store()
+            self.connection.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+
+    def _migrate_json_store(self):
+        # Runs once, when the database is first created; the JSON file is left in place
+        if not os.path.exists(self.json_path):
+            return
+        with open(self.json_path, 'r') as f:
+            lists = json.load(f)
+        self.connection.executemany("INSERT OR IGNORE INTO lists (name) VALUES (?)", [(name,) for name in lists])
+        self.connection.executemany(
+            "INSERT INTO items (list_name, item) VALUES (?, ?)",
+            [(name, item) for name, items in lists.items() for item in items],
+        )
+        self.log.info(f"Migrated {len(lists)} lists from {self.json_path} to {self.db_path}")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs every change made inside the block in a single transaction, committed
+        once at the end, or rolled back if the block raises.
+        """
+        with self.lock:
+            if self.transaction_depth == 0:
+                # Take the write lock up front, so concurrent writers queue rather than deadlock
+                self.connection.execute("BEGIN IMMEDIATE")
+            self.transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.transaction_depth -= 1
+                if self.transaction_depth == 0:
+                    self.connection.execute("ROLLBACK")
+                raise
+            self.transaction_depth -= 1
+            if self.transaction_depth == 0:
+                self.connection.execute("COMMIT")
+
+    def list_names(self):
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT name FROM lists ORDER BY rowid")]
+
+    def has_list(self, list):
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM lists WHERE name = ?", (list,)).fetchone() is not None
+
+    def get_items(self, list):
+        with self.lock:
+            if not self.has_list(list):
+                return None
+            rows = self.connection.execute("SELECT item FROM items WHERE list_name = ? ORDER BY id", (list,))
+            return [row[0] for row in rows]
+
+    def create_list(self, list):
+        with self.transaction():
+            return self.connection.execute("INSERT OR IGNORE INTO lists (name) VALUES (?)", (list,)).rowcount == 1
+
+    def remove_list(self, list):
+        with self.transaction():
+            return self.connection.execute("DELETE FROM lists WHERE name = ?", (list,)).rowcount == 1
+
+    def add_item(self, list, item):
+        with self.transaction():
+            if not self.has_list(list):
+                return False
+            self.connection.execute("INSERT INTO items (list_name, item) VALUES (?, ?)", (list, item))
+            return True
+
+    def remove_item(self, list, item):
+        # Removes the oldest matching item only, like list.remove
+        with self.transaction():
+            cursor = self.connection.execute(
+                "DELETE FROM items WHERE id = (SELECT id FROM items WHERE list_name = ? AND item = ? ORDER BY id LIMIT 1)",
+                (list, item),
+            )
+            return cursor.rowcount == 1
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
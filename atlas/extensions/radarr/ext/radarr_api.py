@@ -1,33 +1,75 @@
 import json
+import os
+import time
 import requests
+from collections import OrderedDict
 from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from atlas.intent_index import normalize_phrase
 
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Seconds a lookup result is reused for, and how many search terms are remembered
+LOOKUP_CACHE_TTL = 300
+LOOKUP_CACHE_SIZE = 64
+# Seconds allowed to connect to Radarr, and to wait for its response
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 10
+# Connections kept alive to the Radarr host
+CONNECTION_POOL_SIZE = 4
+
 class RadarrAPI:
-    def __init__(self, base_url, api_key, logger):
+    def __init__(self, base_url, api_key, logger, cache_ttl=None, timeout=None):
         self.base_url = base_url
         self.api_key = api_key
         self.log = logger
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.environ.get('RADARR_EXT__LOOKUP_CACHE_TTL', LOOKUP_CACHE_TTL))
+        self.timeout = timeout if timeout is not None else (CONNECT_TIMEOUT, READ_TIMEOUT)
+        # Normalized search term -> (expiry time, top match), least recently used first
+        self.lookup_cache = OrderedDict()
+
+        # One keep-alive session, so repeated calls skip the TCP and TLS handshakes
+        self.session = requests.Session()
+        self.session.headers['X-Api-Key'] = self.api_key or ''
+        self.session.verify = False
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CONNECTION_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def search_top_match(self, search_term):
+        key = normalize_phrase(search_term).strip()
+        cached = self.lookup_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.lookup_cache.move_to_end(key)
+            self.log.debug(f"Using cached lookup for: '{search_term}'")
+            return cached[1], None
+
+        movie, system_msg = self._lookup_top_match(search_term)
+        if movie:
+            self.lookup_cache[key] = (time.monotonic() + self.cache_ttl, movie)
+            self.lookup_cache.move_to_end(key)
+            if len(self.lookup_cache) > LOOKUP_CACHE_SIZE:
+                self.lookup_cache.popitem(last=False)
+        return movie, system_msg
 
-    def search_top_match(self,search_term):
+    def _lookup_top_match(self, search_term):
         try:
             url = f"{self.base_url}/api/v3/movie/lookup?term={quote(search_term)}"
             self.log.debug(f"Searching for movie: '{search_term}' with url: '{url}'")
-            headers = {
-                'X-Api-Key': self.api_key
-            }
-            response = requests.get(url, headers=headers, verify=False)
+            response = self.session.get(url, timeout=self.timeout)
 
             if response.status_code == 200:
                 if response.text is None:
                     return None, "Tell the user something went wrong with the response text."
-                
-                movie = response.json()[0]
-                
+
+                results = response.json()
+                if not results:
+                    return None, f"Tell the user no movie matched '{search_term}'."
+                movie = results[0]
+
                 self.log.debug(json.dumps(movie, indent=4))
-                
+
                 return {
                     'tmdbId': movie.get('tmdbId'),
                     'title': movie.get('title'),
@@ -47,14 +89,10 @@ class RadarrAPI:
     def download_movie(self, movie, quality_profile_id=4, root_folder_path='/data/media/movies/'):
         # Data for the movie to add
         url = f"{self.base_url}/api/v3/movie"
-        
-        headers = {
-            'X-Api-Key': self.api_key
-        }
-        
+
         data = {
             'tmdbId': movie.get('tmdbId'),
-            'title': movie.get('title'), 
+            'title': movie.get('title'),
             'qualityProfileId': quality_profile_id,
             'year': movie.get('year'),
             'rootFolderPath': root_folder_path,
@@ -63,16 +101,31 @@ class RadarrAPI:
                 'searchForMovie': True
             }
         }
-        
+
         try:
-            response = requests.post(url, headers=headers, json=data, verify=False)
+            response = self.session.post(url, json=data, timeout=self.timeout)
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
-            self.log.error(f"Error adding movie: {response.text}")
+            if e.response is not None:
+                self.log.error(f"Error adding movie: {e.response.text}")
             return f"Let the user know that something went wrong. The exception was: {e}"
-        
+
         if response.status_code == 201:
-            return f"Let user know that the movie has been added sent to the download queue. Tell them a little trivia about the movie. The movie name is: {movie_data.title}"
+            # The movie is monitored now, so cached lookups of it are stale
+            self.invalidate(movie)
+            return f"Let user know that the movie has been added sent to the download queue. Tell them a little trivia about the movie. The movie name is: {movie.get('title')}"
         else:
             self.log.error(f"Status code was not 201: {response.status_code}")
-            self.log.error(f"Error adding movie: {response.text}")
\ No newline at end of file
+            self.log.error(f"Error adding movie: {response.text}")
+            return f"Let the user know that the movie could not be added. Radarr responded with status code {response.status_code}."
+
+    def invalidate(self, movie):
+        """
+        Drops every cached lookup whose top match is the given movie.
+        """
+        stale = [key for key, (_, cached) in self.lookup_cache.items() if cached.get('tmdbId') == movie.get('tmdbId')]
+        for key in stale:
+            del self.lookup_cache[key]
+
+    def close(self):
+        self.session.close()
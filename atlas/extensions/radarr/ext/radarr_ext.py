@@ -1,31 +1,30 @@
 import os
 from .utils import extract_search_term
-from atlas.extension_router import AtlasExtension
+from atlas.extension_router import AtlasExtension, DirectResponse
 from .radarr_api import RadarrAPI
 
 
-RADARR_API_KEY = os.environ.get('RADARR_EXT__API_KEY')
-RADARR_API_BASE_URL =  os.environ.get('RADARR_EXT__API_KEY')
-
-SEARCH_TERM_CONTEXT__SYSTEM_MSG = "Ask the user to specify the name of the media to search for."
+SEARCH_TERM_CONTEXT__RESPONSE = "What would you like me to download?"
 CATEGORY_CONTEXT__SYSTEM_MSG = "Ask the user to specify a category (movie or tv series). They should not be a 'yes' or 'no' question."
-MOVIE_ALREADY_IN_LIBRARY__SYSTEM_MSG = "Let the user know that the movie is already in the library."
-MOVIE_ALREADY_BEING_MONITORED__SYSTEM_MSG = "Let the user know that the movie is already being monitored."
-MOVIE_IS_NOT_AVAILABLE_FOR_DOWNLOAD__SYSTEM_MSG = "Let the user know that the movie is not available for download yet."
+MOVIE_ALREADY_IN_LIBRARY__RESPONSE = "{title} is already in the library."
+MOVIE_ALREADY_BEING_MONITORED__RESPONSE = "{title} is already being monitored."
+MOVIE_IS_NOT_AVAILABLE_FOR_DOWNLOAD__RESPONSE = "{title} isn't available for download yet."
 
 class RadarrExtension(AtlasExtension):
+    trigger_phrases = {
+        'download': 1,
+        'download the movie': 3,
+        'download me the movie': 3,
+    }
+
     def __init__(self, logger, radar_api = None):
         super().__init__()
         self.log = logger
-        self.radarr_api = radar_api if radar_api is not None else RadarrAPI(RADARR_API_BASE_URL, RADARR_API_KEY, logger)
-        
-    """
-    Used by the extension router to determine whether this extension can handle the given voice input. 
-    """  
-    def can_handle_input(self, voice_input):
-        return 'download' in voice_input
-    
-    
+        if radar_api is None:
+            # Read when constructed rather than imported, so the settings can change within a process
+            radar_api = RadarrAPI(os.environ.get('RADARR_EXT__BASE_URL'), os.environ.get('RADARR_EXT__API_KEY'), logger)
+        self.radarr_api = radar_api
+
     """
     Processes the voice input by extracting the search term. If the search term is not found, the extension will request 
     further context from the user. Ifd the search term is found, the extension will download the movie.
@@ -33,14 +32,11 @@ class RadarrExtension(AtlasExtension):
     """
     def process_voice_input(self, voice_input):        
         
-        search_term = extract_search_term(
-            input = voice_input, 
-            regex = r'(movie|tv series|tv show|series|download me the movie|download the movie|watch the movie|download|watch)(.*?)(\.|,|for|it|$)'
-            )
+        search_term = extract_search_term(input = voice_input)
         
         if not search_term:
             # Requesting further context also starts a conversation. This is used to route the follow-up input to this extension.
-            return self.request_further_context(SEARCH_TERM_CONTEXT__SYSTEM_MSG, start_conversation=True)
+            return self.request_further_context(DirectResponse(SEARCH_TERM_CONTEXT__RESPONSE), start_conversation=True)
         
         return self._add_to_downloads(search_term)
                 
@@ -73,12 +69,12 @@ class RadarrExtension(AtlasExtension):
 
     def _check_movie_state(self, movie):
         if movie.get('hasFile'):
-            return MOVIE_ALREADY_IN_LIBRARY__SYSTEM_MSG
+            return DirectResponse(MOVIE_ALREADY_IN_LIBRARY__RESPONSE, title=movie.get('title'))
         
         if movie.get('monitored'):
-            return MOVIE_ALREADY_BEING_MONITORED__SYSTEM_MSG
+            return DirectResponse(MOVIE_ALREADY_BEING_MONITORED__RESPONSE, title=movie.get('title'))
         
         if movie.get('isAvailable') is False or movie.get('status') != 'released':
-            return MOVIE_IS_NOT_AVAILABLE_FOR_DOWNLOAD__SYSTEM_MSG
+            return DirectResponse(MOVIE_IS_NOT_AVAILABLE_FOR_DOWNLOAD__RESPONSE, title=movie.get('title'))
         
         return None
\ No newline at end of file
@@ -1,19 +1,21 @@
-
-import re
 import string
+from atlas.grammar import GrammarEngine
+
+SEARCH_TERM_GRAMMAR = GrammarEngine().register(
+    'search',
+    r'(?:movie|tv series|tv show|series|download me the movie|download the movie|watch the movie|download|watch)(?P<search_term>.*?)(?:\.|,|for|it|$)'
+)
 
 
-def extract_search_term(input, regex): 
+def extract_search_term(input, grammar=SEARCH_TERM_GRAMMAR):
     try:
-        r = re.compile(regex, re.IGNORECASE)
-        match = re.search(r, input)
-        
-        if not match:
-            return None, None
-        
-        search_term = match.group(2).strip().rstrip(string.punctuation)
-        
-        return search_term
-        
+        _, slots = grammar.match(input)
+        search_term = slots.get('search_term')
+
+        if not search_term:
+            return None
+
+        return search_term.strip().rstrip(string.punctuation) or None
+
     except Exception as e:
         return None
@@ -1,54 +1,92 @@
-import requests, os, re, json, math, datetime, dateparser
-from atlas.extension_router import AtlasExtension
+import asyncio, os, json, math, datetime, functools, dateparser
+from bisect import bisect_left
+from aiohttp import ClientError
+from atlas.extension_router import AsyncAtlasExtension
+from atlas.grammar import GrammarEngine
+from atlas.intent_index import normalize_phrase
+
+# Seconds a location's forecast is reused for; OpenWeather updates it every few hours
+FORECAST_CACHE_TTL = 1800
+# Forecast intervals requested per location, each three hours long. At least two days
+# are fetched so follow-up questions about tonight or tomorrow hit the cache.
+MIN_FORECAST_INTERVALS = 16
+MAX_FORECAST_INTERVALS = 40
+FORECAST_INTERVAL_SECONDS = 3 * 3600
+# Times dateparser can't parse, as the hour of the day they mean or the hours ahead
+HOURS_OF_DAY = {'this afternoon': 15, 'this evening': 19, 'tonight': 21}
+HOURS_AHEAD = {'now': 0.0, 'later': 3.0, 'later today': 3.0}
+
+# Both slots are found in one pass, even where their matches overlap
+GRAMMAR = (
+    GrammarEngine()
+    .register('location', r"\bin\s(?P<location>[\w\s]+)[\?]")
+    .register('time', r"(?P<time>this evening|tomorrow|at \d+pm|on (?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)|next week|later today|later|this afternoon|tonight)")
+)
+
+
+class WeatherExtension(AsyncAtlasExtension):
+    trigger_phrases = ['weather', 'forecast']
 
-class WeatherExtension(AtlasExtension):
     def __init__(self, logger):
         self.log = logger
-        self.base_url = "http://api.openweathermap.org/data/2.5/forecast"
+        self.base_url = os.environ.get('WEATHER_EXT__BASE_URL', "http://api.openweathermap.org/data/2.5/forecast")
         self.api_key = os.environ.get('WEATHER_EXT__API_KEY')
+        self.cache_ttl = float(os.environ.get('WEATHER_EXT__CACHE_TTL', FORECAST_CACHE_TTL))
+        # Normalized location -> ForecastSeries
+        self.forecasts = {}
 
-    def can_handle_input(self, voice_input):
-        # This is a simple example, you might want to use more sophisticated NLP techniques
-        return 'weather' in voice_input.lower()
-
-    def process_voice_input(self, voice_input):
+    async def process_voice_input(self, voice_input):
         # Extract the city name from the voice input
         location, time = self._extract_context(voice_input)
         
         self.log.debug(f"Got location: {location}")
         self.log.debug(f"Got time: {time}")
         
-        time = dateparser.parse(time)
-        
-        self.log.debug(f"Parsed time to datetime: {time}")
-        
-        hours_from_now = (time - datetime.datetime.now()).total_seconds() / 3600
+        hours_from_now = await self._hours_from_now(time)
         
         self.log.debug(f"Got hours from now: {hours_from_now}")
         
-        response = self.get_forecast(location, hours_from_now)
+        response = await self.get_forecast(location, hours_from_now)
         return response
 
-    def get_forecast(self, city, hours_from_now):
-        params = {
-            'q': city,
-            'appid': self.api_key,
-            'units': 'metric'  # Use 'imperial' for Fahrenheit
-        }
-        response = requests.get(self.base_url, params=params)
-        data = response.json()
+    async def _hours_from_now(self, time):
+        now = datetime.datetime.now()
+        if time in HOURS_AHEAD:
+            return HOURS_AHEAD[time]
+        if time in HOURS_OF_DAY:
+            at = now.replace(hour=HOURS_OF_DAY[time], minute=0, second=0, microsecond=0)
+            # Already past, e.g. "this afternoon" asked in the evening
+            return max(0.0, (at - now).total_seconds() / 3600)
 
-        if response.status_code != 200:
-            return f"Sorry, I couldn't get the weather for {city}."
-        
-        # Calculate the nearest 3-hour interval
-        nearest_interval = math.ceil(hours_from_now / 3)
-        self.log.debug(f"Got nearest interval index as: {nearest_interval} ({nearest_interval * 3} hours from now)")
-        if nearest_interval >= len(data['list']):
+        # dateparser can take seconds, e.g. loading its language data, so it runs off the event loop
+        parse = functools.partial(dateparser.parse, settings={'PREFER_DATES_FROM': 'future'})
+        parsed = await asyncio.get_running_loop().run_in_executor(None, parse, time)
+        self.log.debug(f"Parsed time to datetime: {parsed}")
+        if parsed is None:
+            self.log.warning(f"Unable to parse the time '{time}', using the weather for now.")
+            return 0.0
+        return (parsed - now).total_seconds() / 3600
+
+    async def get_forecast(self, city, hours_from_now):
+        now = datetime.datetime.now().timestamp()
+        target = now + hours_from_now * 3600
+
+        key = normalize_phrase(city).strip()
+        series = self.forecasts.get(key)
+        if series is None or not series.covers(target, now):
+            # Only ask for as many intervals as the question needs, beyond the minimum
+            intervals = min(MAX_FORECAST_INTERVALS, max(MIN_FORECAST_INTERVALS, math.ceil(hours_from_now / 3) + 1))
+            series = await self._fetch_forecast(city, intervals, now)
+            if series is None:
+                return f"Sorry, I couldn't get the weather for {city}."
+            self.forecasts[key] = series
+        else:
+            self.log.debug(f"Using cached forecast for: {city}")
+
+        facts = series.at(target)
+        if facts is None:
             return f"Sorry, I couldn't get the weather forecast for {hours_from_now} hours from now."
-        
-        facts = self._get_weather_facts(data, nearest_interval)        
-        
+
         self.log.debug(f"Got weather data: {json.dumps(facts, indent=4)}")
         return f"Tell the user some of the facts about. \
             Make sure the include the temperature and weather description. \
@@ -60,31 +98,56 @@ class WeatherExtension(AtlasExtension):
             Only mention the wind speed if it is greater than 5 km/h or gusts if they are greater than 10km/h \
             Here is the weather data: {facts}"
 
+    async def _fetch_forecast(self, city, intervals, now):
+        params = {
+            'q': city,
+            'appid': self.api_key,
+            'units': 'metric',  # Use 'imperial' for Fahrenheit
+            'cnt': intervals,
+        }
+        # Unlike requests, aiohttp rejects unset parameters rather than dropping them
+        params = {key: value for key, value in params.items() if value is not None}
+        try:
+            async with self.http.get(self.base_url, params=params) as response:
+                if response.status != 200:
+                    self.log.error(f"Weather request for {city} failed with status code {response.status}")
+                    return None
+                data = await response.json()
+        except (ClientError, asyncio.TimeoutError) as e:
+            self.log.error(f"Error requesting the weather for {city}: {e}")
+            return None
+
+        # Keep only the facts we answer with, not the whole payload
+        times, facts = [], []
+        for forecast in data['list']:
+            forecast_facts = self._get_weather_facts(forecast)
+            if forecast_facts is not None:
+                times.append(forecast['dt'])
+                facts.append(forecast_facts)
+        self.log.debug(f"Fetched {len(facts)} forecast intervals for {city}")
+        # Asking for more would not reach any further
+        complete = intervals == MAX_FORECAST_INTERVALS or len(data['list']) < intervals
+        return ForecastSeries(times, facts, now + self.cache_ttl, complete)
+
     def is_in_conversation(self):
         # This extension does not support conversations
         return False
     
     def _extract_context(self, voice_input):
-        location_regex = r"in\s([\w\s]+)[\?]"
-        time_regex = r"(this evening|tomorrow|at \d+pm|on (monday|tuesday|wednesday|thursday|friday|saturday|sunday)|next week|later today|later|this afternoon|tonight)"
+        slots = GRAMMAR.scan(voice_input)
 
-        location_match = re.search(location_regex, voice_input)
-        time_match = re.search(time_regex, voice_input)
-        
-        location = location_match.group(1) if location_match else "Silkstone, UK"
-        time = time_match.group(1) if time_match else "now"
+        location = slots['location']['location'] if 'location' in slots else "Silkstone, UK"
+        time = slots['time']['time'] if 'time' in slots else "now"
         
         return location, time
     
-    def _get_weather_facts(self, data, nearest_interval):
+    def _get_weather_facts(self, forecast):
         try:
-                
-            forecast = data['list'][nearest_interval]
             return {
                 'temperature': forecast['main']['temp'],
                 'weather': forecast['weather'][0]['description'],
                 'wind_speed': forecast['wind']['speed'],
-                'wind_gust': forecast['wind']['gust'],
+                'wind_gust': forecast['wind'].get('gust', 0),
                 'wind_direction': forecast['wind']['deg'],
                 'humidity': forecast['main']['humidity'],
                 'cloudiness': forecast['clouds']['all'],
@@ -94,6 +157,42 @@ class WeatherExtension(AtlasExtension):
         except Exception as e:
             self.log.error(f"Error getting weather facts: {e}")
             return None
-        
 
-            
\ No newline at end of file
+
+class ForecastSeries:
+    """
+    The parsed forecast for one location: the facts of each three-hour interval,
+    indexed by the interval's timestamp.
+    """
+
+    def __init__(self, times, facts, expires_at, complete=False):
+        """
+        :param times: Unix timestamps of the intervals, in ascending order.
+        :param facts: The facts of each interval.
+        :param expires_at: Unix timestamp after which the series is stale.
+        :param complete: Whether the series already holds every interval OpenWeather offers.
+        """
+        self.times = times
+        self.facts = facts
+        self.expires_at = expires_at
+        self.complete = complete
+
+    def covers(self, timestamp, now):
+        """
+        Checks whether the series is fresh and reaches far enough ahead to answer for the timestamp.
+        """
+        if now >= self.expires_at:
+            return False
+        return self.complete or (bool(self.times) and timestamp <= self.times[-1] + FORECAST_INTERVAL_SECONDS / 2)
+
+    def at(self, timestamp):
+        """
+        Looks up the facts of the interval nearest to the timestamp.
+        :return: The facts, or None if the timestamp is beyond the forecast.
+        """
+        if not self.times or timestamp > self.times[-1] + FORECAST_INTERVAL_SECONDS / 2:
+            return None
+        index = bisect_left(self.times, timestamp)
+        if index == len(self.times) or (index > 0 and timestamp - self.times[index - 1] < self.times[index] - timestamp):
+            index -= 1
+        return self.facts[index]
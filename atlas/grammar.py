@@ -0,0 +1,180 @@
+import re
+
+# Leading literal text of a grammar, e.g. "add " in r"\badd (?P<item>.*?) to ..."
+LITERAL_PREFIX = re.compile(r"(?:\\b)?([A-Za-z0-9' ]+)")
+QUANTIFIERS = "?*+{"
+
+
+class GrammarEngine:
+    """
+    Extracts an action and its slots from a transcript. Extensions register
+    their slot grammars once, at load time, as regular expressions whose named
+    groups are the slots.
+
+    The engine compiles the leading keyword of every grammar into a single trie
+    pattern, so one scan of the transcript finds every position where a grammar
+    could start; only the grammars anchored there are then tried. Grammars that
+    do not start with a literal keyword are searched for separately.
+    """
+
+    def __init__(self, flags=re.IGNORECASE):
+        self.flags = flags
+        self.grammars = []
+        self.compiled = False
+
+    def register(self, action, grammar):
+        """
+        Registers a grammar for an action. Several grammars may share an action;
+        where grammars match at the same position, the first registered wins.
+        :param action: The action the grammar extracts, e.g. 'add'.
+        :param grammar: A regular expression with a named group per slot.
+        """
+        self.grammars.append((action, grammar))
+        self.compiled = False
+        return self
+
+    def compile(self):
+        """
+        Compiles the grammars and the combined keyword pattern. Called
+        automatically on first use.
+        """
+        self.patterns = []
+        # First character -> [(keyword, grammar index)], in registration order
+        self.anchored = {}
+        self.unanchored = []
+        keywords = set()
+
+        for index, (action, grammar) in enumerate(self.grammars):
+            self.patterns.append((action, re.compile(grammar, self.flags)))
+            keyword = _literal_prefix(grammar).lower()
+            if keyword:
+                keywords.add(keyword)
+                self.anchored.setdefault(keyword[0], []).append((keyword, index))
+            else:
+                self.unanchored.append(index)
+
+        # A zero-width lookahead reports every start position, even where keywords overlap
+        self.keyword_pattern = re.compile(f"(?=(?:{_trie_pattern(keywords)}))", self.flags) if keywords else None
+        self.compiled = True
+
+    def match(self, text):
+        """
+        Finds the leftmost grammar match in the text.
+        :return: Tuple of the action and a dict of its slots, or (None, {}) if nothing matched.
+        """
+        best = min(self._unanchored_matches(text), key=lambda item: item[:2], default=None)
+        for position, index, match in self._anchored_matches(text):
+            # Anchored matches come in position order, so nothing further right can win
+            if best is not None and position > best[0]:
+                break
+            if best is None or (position, index) < best[:2]:
+                best = (position, index, match)
+        if best is None:
+            return None, {}
+        action, _ = self.patterns[best[1]]
+        return action, best[2].groupdict()
+
+    def scan(self, text):
+        """
+        Finds the first match of every action, allowing the matches of different
+        actions to overlap.
+        :return: Dict of action to its slots.
+        """
+        matches = [*self._anchored_matches(text), *self._unanchored_matches(text)]
+        results = {}
+        for _, index, match in sorted(matches, key=lambda item: item[:2]):
+            action, _ = self.patterns[index]
+            results.setdefault(action, match.groupdict())
+        return results
+
+    def _anchored_matches(self, text):
+        """
+        Yields (position, grammar index, match) for the grammars starting with a
+        keyword, in position order.
+        """
+        if not self.compiled:
+            self.compile()
+        if not self.keyword_pattern:
+            return
+
+        for keyword_match in self.keyword_pattern.finditer(text):
+            position = keyword_match.start()
+            for keyword, index in self.anchored.get(text[position].lower(), []):
+                if text[position:position + len(keyword)].lower() != keyword:
+                    continue
+                match = self.patterns[index][1].match(text, position)
+                if match:
+                    yield position, index, match
+
+    def _unanchored_matches(self, text):
+        """
+        Yields (position, grammar index, match) for the first match of each
+        grammar without a leading keyword.
+        """
+        if not self.compiled:
+            self.compile()
+        for index in self.unanchored:
+            match = self.patterns[index][1].search(text)
+            if match:
+                yield match.start(), index, match
+
+
+def _literal_prefix(grammar):
+    # Each branch of a top-level alternation starts differently, so none can anchor the grammar
+    if _has_top_level_alternation(grammar):
+        return ""
+    match = LITERAL_PREFIX.match(grammar)
+    if not match:
+        return ""
+    prefix = match.group(1)
+    # A quantifier after the prefix applies to its last character, which is then optional
+    if match.end() < len(grammar) and grammar[match.end()] in QUANTIFIERS:
+        prefix = prefix[:-1]
+    return prefix
+
+
+def _has_top_level_alternation(grammar):
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in grammar:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def _trie_pattern(keywords):
+    """
+    Builds a regular expression matching any of the keywords, factored into a
+    prefix trie so the regex engine never retries a shared prefix.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _trie_node_pattern(trie)
+
+
+def _trie_node_pattern(node):
+    branches = [re.escape(char) + _trie_node_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    # A keyword ending here makes the rest of the branch optional
+    if "" in node:
+        pattern = f"(?:{pattern})?"
+    return pattern
@@ -0,0 +1,90 @@
+import asyncio
+import os
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+DEFAULT_CONNECTION_LIMIT = 32
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 4
+# Seconds allowed for a whole request, and for establishing its connection
+DEFAULT_TIMEOUT = 10
+DEFAULT_CONNECT_TIMEOUT = 3
+# Seconds resolved host names are cached for
+DEFAULT_DNS_CACHE_TTL = 300
+
+
+class HTTPClient:
+    """
+    Connection-pooled HTTP client shared by extensions. Connections are kept
+    alive between requests, capped in total and per host, and every request
+    is bounded by a timeout so a slow upstream cannot hold up a turn.
+    """
+
+    def __init__(self, logger, limit=None, limit_per_host=None, timeout=None, connect_timeout=None, dns_cache_ttl=None):
+        self.log = logger
+        self.limit = _setting(limit, "ATLAS__HTTP_LIMIT", DEFAULT_CONNECTION_LIMIT, int)
+        self.limit_per_host = _setting(limit_per_host, "ATLAS__HTTP_LIMIT_PER_HOST", DEFAULT_CONNECTION_LIMIT_PER_HOST, int)
+        self.timeout = _setting(timeout, "ATLAS__HTTP_TIMEOUT", DEFAULT_TIMEOUT, float)
+        self.connect_timeout = _setting(connect_timeout, "ATLAS__HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT, float)
+        self.dns_cache_ttl = get_dns_cache_ttl(dns_cache_ttl)
+        self.session = None
+
+    def get_session(self):
+        """
+        Returns the shared session, opening it on first use. Must be called
+        from the event loop the session will be used on.
+        """
+        if self.session is None or self.session.closed:
+            connector = TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, ttl_dns_cache=self.dns_cache_ttl)
+            timeout = ClientTimeout(total=self.timeout, connect=self.connect_timeout)
+            self.session = ClientSession(connector=connector, timeout=timeout)
+            self.log.debug(f"Opened shared HTTP session ({self.limit} connections, {self.limit_per_host} per host).")
+        return self.session
+
+    def get(self, url, **kwargs):
+        """
+        Makes a GET request, for use as `async with http.get(url) as response:`.
+        """
+        return self.get_session().get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """
+        Makes a POST request, for use as `async with http.post(url) as response:`.
+        """
+        return self.get_session().post(url, **kwargs)
+
+    async def prewarm(self, url):
+        """
+        Opens a keep-alive connection to the url's host ahead of the first request.
+        The response itself is ignored.
+        """
+        await prewarm_connection(self.log, self.get_session(), url)
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+
+def get_dns_cache_ttl(dns_cache_ttl=None):
+    """
+    :return: Seconds resolved host names are cached for; defaults to ATLAS__DNS_CACHE_TTL.
+    """
+    return _setting(dns_cache_ttl, "ATLAS__DNS_CACHE_TTL", DEFAULT_DNS_CACHE_TTL, int)
+
+
+async def prewarm_connection(logger, session, url):
+    """
+    Opens a keep-alive connection from the session's pool to the url's host,
+    so the first real request skips the DNS lookup and the TCP and TLS handshakes.
+    """
+    try:
+        async with session.head(url) as response:
+            await response.read()
+        logger.debug(f"Pre-warmed connection to {url}")
+    except (ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"Unable to pre-warm connection to {url}: {e}")
+
+
+def _setting(value, env_var, default, cast):
+    if value is not None:
+        return value
+    return cast(os.environ.get(env_var, default))
@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+from importlib.abc import MetaPathFinder
+
+# Modules listed in the report, slowest first
+REPORT_LENGTH = 20
+
+
+class ImportTimer(MetaPathFinder):
+    """
+    Times every module imported while installed, in the manner of
+    `python -X importtime`: each module's own execution time, and the
+    cumulative time including the modules it imported in turn.
+    """
+
+    def __init__(self):
+        # Module name -> [self seconds, cumulative seconds], in import order
+        self.timings = {}
+        # Modules being imported, innermost last, as [name, start time, seconds spent in children]
+        self.stack = []
+        # Seconds spent importing, counting nested imports once
+        self.total = 0.0
+        self.installed_at = None
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+            self.installed_at = time.perf_counter()
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        # Let the other finders locate the module, then time its loader
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def start(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def stop(self):
+        name, started_at, children = self.stack.pop()
+        elapsed = time.perf_counter() - started_at
+        timing = self.timings.setdefault(name, [0.0, 0.0])
+        timing[0] += elapsed - children
+        timing[1] += elapsed
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        else:
+            self.total += elapsed
+
+    def report(self, logger, budget_ms=None, length=REPORT_LENGTH):
+        """
+        Logs the slowest imports, and warns if startup has taken longer than the budget.
+        :param budget_ms: Startup time budget in milliseconds, counted from when the timer was
+                          installed; defaults to ATLAS__IMPORT_TIME_BUDGET_MS.
+        """
+        if budget_ms is None and os.environ.get("ATLAS__IMPORT_TIME_BUDGET_MS"):
+            budget_ms = float(os.environ["ATLAS__IMPORT_TIME_BUDGET_MS"])
+
+        slowest = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)[:length]
+        lines = [f"{'self [ms]':>10} | {'cumulative [ms]':>15} | module"]
+        for name, (own, cumulative) in slowest:
+            lines.append(f"{own * 1000:>10.1f} | {cumulative * 1000:>15.1f} | {name}")
+        startup_ms = (time.perf_counter() - self.installed_at) * 1000 if self.installed_at else 0
+        logger.info(
+            f"Imported {len(self.timings)} modules in {self.total * 1000:.0f}ms of {startup_ms:.0f}ms of startup. "
+            f"Slowest imports:\n" + "\n".join(lines)
+        )
+
+        if budget_ms is not None and startup_ms > budget_ms:
+            logger.warning(f"Startup took {startup_ms:.0f}ms, over the budget of {budget_ms:.0f}ms.")
+
+
+class _TimedLoader:
+    """
+    Wraps a module's loader to time it. The real loader is put back on the module
+    before it executes, so nothing else ever sees the wrapper.
+    """
+
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        # Extension modules are loaded here rather than when executed
+        self.timer.start(spec.name)
+        try:
+            return self.loader.create_module(spec)
+        finally:
+            self.timer.stop()
+
+    def exec_module(self, module):
+        module.__spec__.loader = self.loader
+        module.__loader__ = self.loader
+        self.timer.start(module.__name__)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.stop()
+
+
+_timer = None
+
+
+def install():
+    """
+    Starts timing imports, if ATLAS__IMPORT_TIME_REPORT is set. Called as the
+    atlas package is imported, so it sees every import made on startup.
+    """
+    global _timer
+    if _timer is None and os.environ.get("ATLAS__IMPORT_TIME_REPORT", "false").lower() == "true":
+        _timer = ImportTimer().install()
+    return _timer
+
+
+def report(logger):
+    """
+    Logs the import time report, if imports are being timed.
+    """
+    if _timer is not None:
+        _timer.report(logger)
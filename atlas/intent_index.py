@@ -0,0 +1,89 @@
+import re
+from collections import deque
+
+NON_WORD = re.compile(r"[^a-z0-9']+")
+
+
+def normalize_phrase(text):
+    """
+    Lowercases text and reduces it to words separated by single spaces, padded
+    with a space on each side so phrases only ever match whole words.
+    """
+    return f" {' '.join(NON_WORD.sub(' ', text.lower()).split())} "
+
+
+class IntentIndex:
+    """
+    Aho-Corasick automaton over the trigger phrases of many targets. Every
+    phrase found in a transcript is collected in a single pass, however many
+    phrases and targets there are.
+    """
+
+    def __init__(self):
+        self.transitions = [{}]
+        self.fail = [0]
+        # Phrases ending at each state, as (target, phrase, weight)
+        self.outputs = [[]]
+        self.compiled = False
+
+    def add(self, phrase, target, weight=None):
+        """
+        Adds a trigger phrase for a target.
+        :param weight: Score the phrase contributes; defaults to its word count,
+                       so more specific phrases outweigh single keywords.
+        """
+        normalized = normalize_phrase(phrase)
+        if weight is None:
+            weight = len(normalized.split())
+
+        state = 0
+        for char in normalized:
+            if char not in self.transitions[state]:
+                self.transitions.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.transitions[state][char] = len(self.transitions) - 1
+            state = self.transitions[state][char]
+        self.outputs[state].append((target, normalized, weight))
+        self.compiled = False
+
+    def compile(self):
+        """
+        Builds the failure links. Called automatically on the first search.
+        """
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(char, 0)
+                # Shallower states are finished first, so their outputs are already complete
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+        self.compiled = True
+
+    def search(self, text):
+        """
+        Scores every target whose phrases appear in the text.
+        :param text: The transcript.
+        :return: Dict of target to score, summing the weights of distinct phrases matched.
+        """
+        if not self.compiled:
+            self.compile()
+        text = normalize_phrase(text)
+
+        matched = {}
+        state = 0
+        for char in text:
+            while state and char not in self.transitions[state]:
+                state = self.fail[state]
+            state = self.transitions[state].get(char, 0)
+            for target, phrase, weight in self.outputs[state]:
+                matched[(target, phrase)] = weight
+
+        scores = {}
+        for (target, _), weight in matched.items():
+            scores[target] = scores.get(target, 0) + weight
+        return scores
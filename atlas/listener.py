@@ -1,23 +1,76 @@
+import asyncio
+import json
+import os
+import time
 import uuid
-from speech_recognition import Recognizer, Microphone, UnknownValueError, RequestError
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from speech_recognition import AudioData, Recognizer, Microphone, RequestError
 import threading
-import queue
+from .stt import GoogleSTTBackend
+from .vad import VoiceActivityDetector
+
+# Relative change in the energy threshold before the calibration is saved again
+CALIBRATION_DRIFT = 0.1
+
+
+class SpeechEvent:
+    """
+    A recognized utterance, with monotonic timestamps for each stage it went through.
+    """
+
+    def __init__(self, speech_started_at, speech_ended_at):
+        self.event_id = uuid.uuid4()
+        self.text = None
+        self.speech_started_at = speech_started_at
+        self.speech_ended_at = speech_ended_at
+        self.recognition_started_at = None
+        self.recognized_at = None
+
+    def __repr__(self):
+        return f"SpeechEvent({self.event_id}, text={self.text!r})"
+
+    def timings(self):
+        return {
+            "speech": self.speech_ended_at - self.speech_started_at,
+            "queued": self.recognition_started_at - self.speech_ended_at,
+            "recognition": self.recognized_at - self.recognition_started_at,
+        }
+
 
 class Listener:
-    def __init__(self, logger):
+    def __init__(self, logger, stt_backend=None, stt_workers=2):
         self.log = logger
         self.recognizer = Recognizer()
+        self.stt_backend = stt_backend if stt_backend is not None else GoogleSTTBackend(self.recognizer)
+        # Recognition runs here so capture can go straight back to listening
+        self.stt_pool = ThreadPoolExecutor(max_workers=stt_workers, thread_name_prefix="stt")
+        # Recognitions in capture order; transcripts are only delivered from the head
+        self.pending_recognitions = deque()
+        self.pending_lock = threading.Lock()
+        self.calibration_path = f"{os.path.dirname(os.path.abspath(__file__))}/noise_calibration.json"
+        self.saved_energy_threshold = None
+        self.vad = None
 
         self.listening = False
-        self.paused = False
+        # Cleared while paused; the listener thread blocks on it instead of spinning
+        self.unpaused_event = threading.Event()
+        self.unpaused_event.set()
 
-        self.speech_queue = queue.Queue()
+        # Written from the listener thread via the loop, read by coroutines on the loop
+        self.loop = None
+        self.speech_queue = asyncio.Queue()
+        # Set as soon as the user starts speaking, before the utterance is recognized
+        self.speech_started = asyncio.Event()
+        # Set once the microphone is open and calibrated
+        self.ready_event = threading.Event()
         self.listener_thread = threading.Thread(target=self.run_listener, daemon=True)
         self.stop_event = threading.Event()
 
         self.log.success("Listener initialized.")
 
-    def start_listening(self):
+    def start_listening(self, loop=None):
+        self.loop = loop or asyncio.get_running_loop()
         self.listening = True
         if not self.listener_thread.is_alive():
             self.listener_thread.start()
@@ -26,50 +79,181 @@ class Listener:
 
     def stop_listening(self):
         self.listening = False
+        self.unpaused_event.set()
         if self.listener_thread.is_alive():
             self.listener_thread.join()
             self.log.debug("Stopping listener...")
+        self.stt_pool.shutdown(wait=False)
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Blocks until the microphone is open and calibrated.
+        :return: False if the timeout passed first.
+        """
+        return self.ready_event.wait(timeout)
 
     def pause_listening(self):
-        self.paused = True
+        self.unpaused_event.clear()
 
     def resume_listening(self):
-        self.paused = False
+        self.unpaused_event.set()
+
+    def is_paused(self):
+        return not self.unpaused_event.is_set()
 
     def run_listener(self):
-        while self.listening:
-            if self.paused:
-                continue
-            try:
-                with Microphone() as source:
-                    self.recognizer.adjust_for_ambient_noise(source=source, duration=1)
-                    audio = self.recognizer.listen(source)
-
-                    try:
-                        text = self.recognizer.recognize_google(audio)
-                        self.speech_queue.put(text)
-                        self.log.info(f"Recognized speech: {text}")
-
-                    except UnknownValueError:
-                        self.log.debug(
-                            "Picked up noise, but didn't recognize it as human voice. Ignoring."
-                        )
-
-                    except RequestError:
-                        self.log.error(
-                            "Could not request results from Google Speech Recognition service"
-                        )
-                        raise
-
-            except Exception as e:
-                self.log.error(
-                    f"An error occurred in the speech recognition process: {e}"
-                )
-                raise
+        try:
+            # Keep one capture stream open for the lifetime of the listener
+            with Microphone() as source:
+                self._calibrate(source)
+                self.ready_event.set()
+                while self.listening:
+                    if self.is_paused():
+                        self.unpaused_event.wait()
+                        self._drain_stream(source)
+                        continue
+
+                    audio, speech_started_at = self._capture_utterance(source)
+                    if audio is None:
+                        continue
+
+                    self.submit_recognition(audio, speech_started_at, time.monotonic())
+                    self._save_calibration_if_drifted()
+
+        except Exception as e:
+            self.log.error(
+                f"An error occurred in the speech recognition process: {e}"
+            )
+            raise
+
+        finally:
+            if self.vad:
+                self._save_calibration_if_drifted()
+
+    def _capture_utterance(self, source):
+        """
+        Reads frames through the voice activity detector until an utterance ends.
+        Non-speech is dropped locally, so noise never reaches the STT service.
+        :return: Tuple of AudioData for the utterance, or None if listening was
+                 interrupted, and the time speech was first detected.
+        """
+        self.vad.reset()
+        speech_started_at = None
+        while self.listening and not self.is_paused():
+            frame = source.stream.read(self.vad.samples_per_frame)
+            utterance = self.vad.process(frame)
+            if speech_started_at is None and self.vad.utterance is not None:
+                speech_started_at = time.monotonic()
+                self.loop.call_soon_threadsafe(self.speech_started.set)
+            if utterance:
+                return AudioData(utterance, source.SAMPLE_RATE, source.SAMPLE_WIDTH), speech_started_at
+        return None, None
+
+    def submit_recognition(self, audio, speech_started_at, speech_ended_at):
+        """
+        Hands an utterance to the STT backend without waiting for the transcript.
+        """
+        event = SpeechEvent(speech_started_at or speech_ended_at, speech_ended_at)
+        future = self.stt_pool.submit(self._recognize, audio, event)
+        with self.pending_lock:
+            self.pending_recognitions.append(future)
+        future.add_done_callback(self._deliver_recognitions)
+        return event
+
+    def _recognize(self, audio, event):
+        event.recognition_started_at = time.monotonic()
+        try:
+            event.text = self.stt_backend.recognize(audio)
+        except RequestError as e:
+            self.log.error(f"Could not request results from the speech recognition service: {e}")
+        except Exception as e:
+            self.log.error(f"An error occurred in the speech recognition process: {e}")
+        event.recognized_at = time.monotonic()
+        return event
+
+    def _deliver_recognitions(self, _):
+        # Publish finished recognitions from the head only, so later utterances never overtake earlier ones
+        with self.pending_lock:
+            while self.pending_recognitions and self.pending_recognitions[0].done():
+                event = self.pending_recognitions.popleft().result()
+                if event.text:
+                    self.log.info(f"Recognized speech: {event.text} {event.timings()}")
+                    self._publish(event)
+                else:
+                    self.log.debug(
+                        "Picked up noise, but didn't recognize it as human voice. Ignoring."
+                    )
+
+    def _calibrate(self, source):
+        # The threshold keeps adapting while listening, so a saved value only needs to be close
+        self.vad = VoiceActivityDetector(source.SAMPLE_RATE)
+        energy_threshold = self.load_calibration()
+        if energy_threshold:
+            self.vad.energy_threshold = energy_threshold
+            # Already on disk, so only save again once the threshold drifts from it
+            self.saved_energy_threshold = energy_threshold
+            self.log.debug(f"Using saved energy threshold: {energy_threshold}")
+            return
+
+        self.log.debug("Calibrating for ambient noise...")
+        frame_count = 1000 // self.vad.frame_ms
+        self.vad.calibrate(source.stream.read(self.vad.samples_per_frame) for _ in range(frame_count))
+        self.save_calibration()
+
+    def _drain_stream(self, source):
+        # Discard audio buffered while paused, e.g. the assistant's own speech
+        try:
+            available = source.stream.pyaudio_stream.get_read_available()
+            if available:
+                source.stream.read(available)
+        except Exception as e:
+            self.log.warning(f"Unable to drain microphone stream: {e}")
+
+    def load_calibration(self):
+        if os.path.exists(self.calibration_path):
+            with open(self.calibration_path, 'r') as f:
+                return json.load(f).get("energy_threshold")
+        self.log.debug(f"Calibration file not found at {self.calibration_path}.")
+
+    def save_calibration(self):
+        self.saved_energy_threshold = self.vad.energy_threshold
+        with open(self.calibration_path, 'w') as f:
+            json.dump({"energy_threshold": self.saved_energy_threshold}, f, indent=4)
+        self.log.debug(f"Saved calibration to {self.calibration_path}")
+
+    def _save_calibration_if_drifted(self):
+        saved = self.saved_energy_threshold
+        if not saved or abs(self.vad.energy_threshold - saved) / saved > CALIBRATION_DRIFT:
+            self.save_calibration()
+
+    def _publish(self, event):
+        # asyncio.Queue is not thread-safe, so hand the event over to the loop's thread
+        self.loop.call_soon_threadsafe(self.speech_queue.put_nowait, event)
 
     def get_speech_event(self):
         try:
-            event = self.speech_queue.get_nowait()
-            return event, uuid.uuid4()
-        except queue.Empty:
-            return None, None
+            return self.speech_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    async def get_speech_event_async(self):
+        """
+        Waits for the next recognized utterance.
+        :return: The SpeechEvent, with its text, event id and timings.
+        """
+        return await self.speech_queue.get()
+
+    async def wait_for_speech_start(self):
+        """
+        Waits until the user next starts speaking, e.g. to interrupt playback.
+        """
+        self.speech_started.clear()
+        await self.speech_started.wait()
+
+    async def listen_async(self, loop=None):
+        """
+        Waits for the next recognized utterance and returns only its text.
+        :param loop: Unused; the loop is bound when the listener is started.
+        """
+        event = await self.get_speech_event_async()
+        return event.text
@@ -1,51 +1,29 @@
-import json
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import dotenv
 import asyncio
+import inspect
 import traceback
 from loguru import logger as log
-from memory_profiler import profile
 
 
 from atlas.audio_mixer import Mixer
 from atlas.openai_api_client import APIClient
+from atlas.pipeline import TurnPipeline
+from atlas.tts_cache import ClipCache
 from atlas.listener import Listener
-from atlas.chat_context import Chat, Role
-from atlas.extension_router import AtlasExtension, ExtensionRouter
-from atlas.extensions.radarr.ext.radarr_ext import RadarrExtension
-from atlas.extensions.weather.ext.weather_ext import WeatherExtension
-from atlas.extensions.lists.ext.lists_ext import ListExtension
+from atlas.chat_context import Chat
+from atlas.extension_router import ExtensionRouter
+from atlas.extension_loader import discover_extensions
+from atlas.startup import StartupOrchestrator
+from atlas.tracing import LatencyTracer
+from atlas import import_profile
 
 # Add this module to path
 
-async def _initialize_deps(api_client, chat, listener, mixer):
-    # Initialize API Client
-    try:
-        api_client = await api_client.open_session()
-    except Exception as e:
-        log.error(f"Failed to initialize API client: {e}")
-
-    # Initialize Chat Context
-    try:
-        pass
-    except Exception as e:
-        log.error(f"Failed to initialize chat context: {e}")
-
-    # Initialize Listener
-    try:
-        listener = listener.start_listening()
-    except Exception as e:
-        log.error(f"Failed to initialize listener: {e}")
-
-    # Initialize Mixer
-    try:
-        mixer.init_mixer(log)
-    except Exception as e:
-        log.error(f"Failed to initialize Mixer: {e}")
-
-    return api_client, chat, listener, mixer
+# Seconds to wait for the microphone to open and calibrate
+LISTENER_READY_TIMEOUT = 10
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -67,28 +45,59 @@ async def main_async():
     ##################
     
     router = ExtensionRouter(log)
-    router.add_extension(WeatherExtension(log))
-    router.add_extension(RadarrExtension(log))
-    router.add_extension(ListExtension(log))
+    # Extensions are only imported the first time input is routed to them
+    for extension in discover_extensions(log):
+        router.add_extension(extension)
 
     ##########################
     # SERVICE INITIALIZATION #
     ##########################
-    api_client, chat, listener, mixer = await _initialize_deps(
-        APIClient(log), Chat(log), Listener(log), Mixer(log)
-    )
-
-    # start mixer and listener background services
+    api_client, chat, listener, mixer = APIClient(log, clip_cache=ClipCache(log)), Chat(log), Listener(log), Mixer(log)
+    tracer = LatencyTracer(log)
     loop = asyncio.get_running_loop()
+    listener_ready_timeout = float(os.environ.get("ATLAS__LISTENER_READY_TIMEOUT", LISTENER_READY_TIMEOUT))
+
+    async def _start_api_client():
+        await api_client.open_session()
+        await api_client.prewarm()
+
+    async def _start_listener():
+        listener.start_listening(loop)
+        if not await loop.run_in_executor(None, listener.wait_until_ready, listener_ready_timeout):
+            raise TimeoutError(f"microphone not ready after {listener_ready_timeout:.0f}s")
+
+    async def _prewarm_extensions():
+        for extension in router.extensions:
+            if inspect.iscoroutinefunction(extension.prewarm):
+                await extension.prewarm()
+            else:
+                await loop.run_in_executor(None, extension.prewarm)
+
+    # Independent services start concurrently; calibrating the microphone is the slowest
+    startup = StartupOrchestrator(log)
+    startup.add("api client", _start_api_client)
+    startup.add("listener", _start_listener)
+    startup.add("mixer", lambda: mixer.init_mixer(log))
+    startup.add("metrics", tracer.serve_metrics)
+    startup.add("extensions", _prewarm_extensions, background=True)
+    await startup.run()
+
+    import_profile.report(log)
+
+    # start mixer background service
     mixer_ftr = loop.run_in_executor(None, mixer.start_auto_play_loop)
 
-    #########################
-    # LOCAL SCOPE FUNCTIONS #
-    #########################
+    # Streaming, speculation, full duplex and TTS concurrency are configured from the environment
+    pipeline = TurnPipeline(log, api_client, router, chat, mixer, listener, tracer)
+
     async def _graceful_termination():
         mixer.stop_auto_play_loop()
         await asyncio.wrap_future(mixer_ftr)
+        await pipeline.close()
         await api_client.close_session()
+        await router.close()
+        await tracer.close()
+        chat.close()
 
     #######################
     # MAIN LOOP EXECUTION #
@@ -96,34 +105,12 @@ async def main_async():
     try:
         # Main Loop
         while True:
-            msg, event_id = listener.get_speech_event()
-            
-            if msg:
-                log.debug(f"Processing speech event: '{event_id}'")
-                listener.pause_listening()
-                
-                chat.add_msg(Role.USER, msg)
-                
-                # Run extension middleware
-                handled_msg = router.handle_voice_input(msg)
-                
-                if handled_msg:
-                    log.debug(f'HANDLED MSG: {handled_msg}')
-                    chat.add_msg(Role.SYSTEM, handled_msg)
-
-                response = await api_client.v1_chat_completions_async(chat.context)
-                log.info(f"Responding with: '{response.as_text()}'")
-                chat.add_msg(Role.ASSISTANT, response.as_text())
-
-                chunks = response.as_chunks()
-                clip_gen = api_client.v1_audio_speech_async(chunks)
-
-                async for clip in clip_gen:
-                    mixer.add_clip(clip)
-                    
-                mixer.wait_for_finish()
-                log.debug(f"Finished processing event: '{event_id}'")
-                listener.resume_listening()
+            event = await listener.get_speech_event_async()
+
+            if event.text:
+                log.debug(f"Processing speech event: '{event.event_id}'")
+                await pipeline.handle(event)
+                log.debug(f"Finished processing event: '{event.event_id}'")
 
     except KeyboardInterrupt:
         log.warning("KeyboardInterrupt. Attempting to terminate gracefully...")
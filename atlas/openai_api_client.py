@@ -1,25 +1,48 @@
 import os
+import asyncio
 import aiofiles
 import re
 import time
-from aiohttp import ClientSession
-from memory_profiler import profile
+import uuid
+from json import loads as json_loads
+from aiohttp import ClientSession, TCPConnector
+from .audio_clip import AudioClip
+from .http_client import get_dns_cache_ttl, prewarm_connection
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+OPENAI_API_URL = "https://api.openai.com"
 
 
 class APIClient:
-    def __init__(self, logger):
+    def __init__(self, logger, spool_threshold=None, spool_dir=".tmp", clip_cache=None, base_url=None):
+        """
+        :param base_url: Root URL of the API; defaults to ATLAS__OPENAI_BASE_URL, or the OpenAI API.
+        """
         self.log = logger
         self.api_key = os.environ.get("OPENAI_API_KEY")
+        self.base_url = (base_url or os.environ.get("ATLAS__OPENAI_BASE_URL") or OPENAI_API_URL).rstrip("/")
         self.client_session = None
+        # Clips larger than this many bytes are spooled to disk instead of kept in memory
+        self.spool_threshold = spool_threshold or int(os.environ.get("ATLAS__TTS_SPOOL_THRESHOLD", 0)) or None
+        self.spool_dir = spool_dir
+        self.clip_cache = clip_cache
         self.log.success("API Client initialized.")
 
     async def open_session(self):
         if self.client_session:
             return
-        self.client_session = ClientSession()
+        connector = TCPConnector(ttl_dns_cache=get_dns_cache_ttl())
+        self.client_session = ClientSession(connector=connector)
         self.log.debug("Opening API Client session...")
         return self
 
+    async def prewarm(self):
+        """
+        Opens a keep-alive connection to the API ahead of the first request, so it
+        doesn't pay for the DNS lookup and the TCP and TLS handshakes.
+        """
+        await prewarm_connection(self.log, self.client_session, f"{self.base_url}/v1/models")
+
     async def close_session(self):
         if self.client_session:
             await self.client_session.close()
@@ -36,7 +59,7 @@ class APIClient:
             "temperature": temperature,
         }
         async with self.client_session.post(
-            "https://api.openai.com/v1/chat/completions",
+            f"{self.base_url}/v1/chat/completions",
             json=json,
             headers={"Authorization": f"Bearer {self.api_key}"},
         ) as response:
@@ -54,36 +77,164 @@ class APIClient:
                 )
                 return None
 
+    async def v1_chat_completions_stream_async(
+        self, messages, model="gpt-4-vision-preview", max_tokens=500, n=1, temperature=1.3
+    ):
+        """
+        Streams a chat completion using server-sent events.
+        Yields the text deltas of the first choice as they arrive.
+        """
+        json = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "n": n,
+            "temperature": temperature,
+            "stream": True,
+        }
+        async with self.client_session.post(
+            f"{self.base_url}/v1/chat/completions",
+            json=json,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        ) as response:
+            if response.status == 400:
+                self.log.error(
+                    f"STATUS: {response.status} - Invalid request parameters:\n{await response.text()}\nRequest Parameters:\n{json}"
+                )
+                return
+            elif response.status != 200:
+                self.log.error(
+                    f"STATUS: {response.status} - OpenAI API request failed with response\n{await response.text()}"
+                )
+                return
+
+            async for line in response.content:
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                delta = json_loads(data)["choices"][0]["delta"].get("content")
+                if delta:
+                    yield delta
+
     async def v1_audio_speech_async(
-        self, chunky_text, model="tts-1", voice="echo", response_format="mp3"
+        self, chunky_text, model="tts-1", voice="echo", response_format="mp3", concurrency=1
     ):
-        for chunk in chunky_text:
-            input = {
-                "model": model,
-                "input": chunk,
-                "voice": voice,
-                "response_format": response_format,
-            }
-            async with self.client_session.post(
-                "https://api.openai.com/v1/audio/speech",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                json=input,
-            ) as response:
-                if response.status == 200:
-                    file_path = f'.tmp/speech-{time.strftime("%Y%m%d-%H%M%S")}.mp3'
-                    # Download the speech file
-                    async with aiofiles.open(file_path, "wb") as file:
-                        await file.write(await response.read())
-
-                    yield file_path
-                elif response.status == 400:
-                    self.log.error(
-                        f"STATUS: {response.status} - Invalid request parameters:\n{await response.text()}\nRequest Parameters:\n{input}"
+        """
+        Synthesizes each chunk of text and yields the clips in chunk order.
+        Up to `concurrency` requests are in flight at once, and no more than that
+        many clips are held before the consumer has taken them.
+        """
+        slots = asyncio.Semaphore(concurrency)
+        requests = asyncio.Queue()
+
+        async def _schedule():
+            try:
+                async for chunk in _iterate(chunky_text):
+                    await slots.acquire()
+                    requests.put_nowait(
+                        asyncio.ensure_future(
+                            self._speech_request(chunk, model, voice, response_format)
+                        )
                     )
-                else:
-                    self.log.error(
-                        f"STATUS: {response.status} - OpenAI API request failed with response\n{await response.text()}"
+            finally:
+                requests.put_nowait(None)
+                # Stops a streamed source, e.g. a completion, when synthesis is abandoned
+                if hasattr(chunky_text, "aclose"):
+                    await chunky_text.aclose()
+
+        scheduler = asyncio.ensure_future(_schedule())
+        try:
+            while True:
+                request = await requests.get()
+                if request is None:
+                    break
+                clip = await request
+                if clip:
+                    yield clip
+                # Only once the consumer has taken the clip, so at most `concurrency` are held
+                slots.release()
+
+            # Surface any error raised while reading the chunks
+            await scheduler
+        finally:
+            scheduler.cancel()
+            while not requests.empty():
+                request = requests.get_nowait()
+                if request is not None:
+                    request.cancel()
+
+    async def _speech_request(self, chunk, model, voice, response_format):
+        if self.clip_cache:
+            cache_key = self.clip_cache.key(chunk, model, voice, response_format)
+            data = await self.clip_cache.get(cache_key)
+            if data:
+                self.log.debug(f"Speech cache hit for: '{chunk}' {self.clip_cache.stats()}")
+                return AudioClip(data, text=chunk, format=response_format)
+
+        requested_at = time.monotonic()
+        input = {
+            "model": model,
+            "input": chunk,
+            "voice": voice,
+            "response_format": response_format,
+        }
+        async with self.client_session.post(
+            f"{self.base_url}/v1/audio/speech",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json=input,
+        ) as response:
+            if response.status == 200:
+                # The headers have arrived, so this is as close to the first byte as aiohttp gets
+                first_byte_at = time.monotonic()
+                if self.spool_threshold and (response.content_length or 0) > self.spool_threshold:
+                    path = await self._spool_to_disk(
+                        response.content.iter_chunked(64 * 1024), response_format
                     )
+                    clip = AudioClip(text=chunk, format=response_format, path=path)
+                else:
+                    data = await response.read()
+                    if self.spool_threshold and len(data) > self.spool_threshold:
+                        path = await self._spool_to_disk(_iterate([data]), response_format)
+                        clip = AudioClip(text=chunk, format=response_format, path=path)
+                    else:
+                        if self.clip_cache:
+                            self.clip_cache.put(cache_key, data)
+                        clip = AudioClip(data, text=chunk, format=response_format)
+                clip.requested_at, clip.first_byte_at = requested_at, first_byte_at
+                return clip
+            elif response.status == 400:
+                self.log.error(
+                    f"STATUS: {response.status} - Invalid request parameters:\n{await response.text()}\nRequest Parameters:\n{input}"
+                )
+            else:
+                self.log.error(
+                    f"STATUS: {response.status} - OpenAI API request failed with response\n{await response.text()}"
+                )
+            return None
+
+    async def _spool_to_disk(self, data_chunks, response_format):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"speech-{uuid.uuid4().hex}.{response_format}")
+        async with aiofiles.open(path, "wb") as file:
+            async for data in data_chunks:
+                await file.write(data)
+        self.log.debug(f"Spooled large clip to disk: {path}")
+        return path
+
+
+async def _iterate(chunks):
+    """
+    Iterates over either a plain or an asynchronous iterable of chunks.
+    """
+    if hasattr(chunks, "__aiter__"):
+        async for chunk in chunks:
+            yield chunk
+    else:
+        for chunk in chunks:
+            yield chunk
 
 
 def _split_long_sentence(sentence, max_length):
@@ -96,10 +247,73 @@ def _split_long_sentence(sentence, max_length):
         sentence.rfind("-", 0, max_length),
         sentence.rfind(" ", 0, max_length)
     )
-    
+
+    # No natural break, so cut the sentence hard at max_length
+    if split_point <= 0:
+        return sentence[:max_length], sentence[max_length:]
+
     return sentence[:split_point], sentence[split_point + 1 :], 
 
 
+def _chunk_sentence(sentence, max_chunk_size):
+    """
+    Splits a complete sentence into chunks no longer than max_chunk_size.
+    """
+    chunks = []
+    while len(sentence) > max_chunk_size:
+        sub_chunk, sentence = _split_long_sentence(sentence, max_chunk_size)
+        chunks.append(sub_chunk.strip())
+    chunks.append(sentence.strip())
+    return list(filter(None, chunks))
+
+
+class SentenceSegmenter:
+    """
+    Incrementally splits streamed text into chunks that can be spoken.
+    A chunk is released as soon as the sentence it belongs to is known to be
+    complete, i.e. once the whitespace after its closing punctuation arrives.
+    """
+
+    def __init__(self, logger, max_chunk_size=120):
+        self.log = logger
+        self.max_chunk_size = max_chunk_size
+        self.buffer = ""
+        self.text = ""
+
+    def feed(self, delta):
+        """
+        Adds a text delta and returns any chunks that are now complete.
+        :param delta: The next piece of streamed text.
+        :return: List of complete chunks, possibly empty.
+        """
+        self.text += delta
+        self.buffer += delta
+        *sentences, self.buffer = SENTENCE_BOUNDARY.split(self.buffer)
+
+        chunks = []
+        for sentence in sentences:
+            chunks.extend(_chunk_sentence(sentence, self.max_chunk_size))
+
+        # Release the head of a run-on sentence rather than waiting for its end
+        while len(self.buffer) > self.max_chunk_size:
+            sub_chunk, self.buffer = _split_long_sentence(self.buffer, self.max_chunk_size)
+            if sub_chunk.strip():
+                chunks.append(sub_chunk.strip())
+
+        if chunks:
+            self.log.debug(f"Segmented chunks: {chunks}")
+        return chunks
+
+    def flush(self):
+        """
+        Returns whatever remains in the buffer once the stream has ended.
+        :return: List of the remaining chunks, possibly empty.
+        """
+        chunks = _chunk_sentence(self.buffer, self.max_chunk_size)
+        self.buffer = ""
+        return chunks
+
+
 class ChatResponse:
     def __init__(self, response, logger):
         self.log = logger
@@ -113,29 +327,8 @@ class ChatResponse:
     def as_chunks(self, max_chunk_size=120):
         text = self.as_text()
         self.log.debug(f'Attempting to chunk: "{text}"')
-        sentences = re.split(r"(?<=[.!?]) +", text)
-        chunks = []
-        current_chunk = ""
-        self.log.debug(f"Split response into {len(sentences)} sentences.")
-        for sentence in sentences:
-            # If adding the next sentence exceeds max length, add the current chunk to the list
-            chunks.append(current_chunk.strip())
-            current_chunk = sentence
-
-            # Check for very long sentences and split further at commas or hyphens
-            while len(current_chunk) > max_chunk_size:
-                self.log.debug(f"Current chunk: {current_chunk}")
-                sub_chunk, current_chunk = _split_long_sentence(
-                    current_chunk, max_chunk_size
-                )
-                chunks.append(sub_chunk.strip())
-
-        # Add the last chunk if it's not empty
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-
-        # Filter none values
-        chunks = list(filter(None, chunks))
+        segmenter = SentenceSegmenter(self.log, max_chunk_size)
+        chunks = segmenter.feed(text) + segmenter.flush()
 
         self.log.debug(f"Split response into {len(chunks)} chunks:")
         self.log.debug(f"Chunks: {chunks}")
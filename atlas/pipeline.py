@@ -0,0 +1,214 @@
+import asyncio
+import os
+from contextlib import suppress
+from .openai_api_client import SentenceSegmenter
+from .speculation import SpeculativeCompletion, SpeculationMetrics
+from .chat_context import Role
+from .extension_router import DirectResponse
+
+
+class TurnPipeline:
+    """
+    Takes a recognized utterance through a turn: routing it through the
+    extensions, completing a reply, synthesizing it and handing the clips to
+    the mixer, while tracing how long each stage took.
+    """
+
+    def __init__(self, logger, api_client, router, chat, mixer, listener, tracer,
+                 stream_completions=None, tts_concurrency=None, speculative_completions=None, full_duplex=None):
+        """
+        :param listener: Listener to pause while replying, or to watch for barge-in in full duplex mode.
+        :param stream_completions: Speak each sentence while the rest of the reply is still
+                                   generating; defaults to ATLAS__STREAM_COMPLETIONS.
+        :param tts_concurrency: Speech requests in flight at once; defaults to ATLAS__TTS_CONCURRENCY.
+        :param speculative_completions: Start the completion while extensions are still routing; only
+                                        applies to streamed completions. Defaults to ATLAS__SPECULATIVE_COMPLETIONS.
+        :param full_duplex: Keep listening while speaking, so the user can interrupt; needs a headset
+                            or echo cancellation. Defaults to ATLAS__FULL_DUPLEX.
+        """
+        self.log = logger
+        self.api_client = api_client
+        self.router = router
+        self.chat = chat
+        self.mixer = mixer
+        self.listener = listener
+        self.tracer = tracer
+        self.stream_completions = _flag(stream_completions, "ATLAS__STREAM_COMPLETIONS", "true")
+        self.tts_concurrency = tts_concurrency or int(os.environ.get("ATLAS__TTS_CONCURRENCY", 3))
+        self.speculative_completions = _flag(speculative_completions, "ATLAS__SPECULATIVE_COMPLETIONS", "false")
+        self.full_duplex = _flag(full_duplex, "ATLAS__FULL_DUPLEX", "false")
+        self.speculation_metrics = SpeculationMetrics()
+        self.summary_task = None
+
+    async def handle(self, event):
+        """
+        Runs the turn for a speech event, returning once its reply has been played.
+        :return: The TurnTrace of the turn.
+        """
+        loop = asyncio.get_running_loop()
+        trace = self.tracer.start(event)
+
+        if self.full_duplex:
+            await self._process_turn_with_barge_in(event.text, trace)
+        else:
+            self.listener.pause_listening()
+            await self._process_turn(event.text, trace)
+            await loop.run_in_executor(None, self.mixer.wait_for_finish)
+            self.listener.resume_listening()
+
+        self.tracer.finish(trace)
+        self.log.info(f"Latency: {self.tracer.summary()}")
+
+        # Fold messages that no longer fit the budget into the summary between turns
+        if self.summary_task is None or self.summary_task.done():
+            self.summary_task = asyncio.create_task(self._refresh_summary())
+        return trace
+
+    async def _stream_chunks(self, segmenter, deltas, trace):
+        try:
+            async for delta in deltas:
+                trace.mark("llm_first_token")
+                for chunk in segmenter.feed(delta):
+                    yield chunk
+        finally:
+            await deltas.aclose()
+        for chunk in segmenter.flush():
+            yield chunk
+
+    async def _speak(self, chunks, trace):
+        clips = self.api_client.v1_audio_speech_async(chunks, concurrency=self.tts_concurrency)
+        try:
+            async for clip in clips:
+                trace.add_clip(clip)
+                self.mixer.add_clip(clip)
+        finally:
+            # Closed explicitly, so an abandoned turn stops its requests at once
+            await clips.aclose()
+
+    def _record_reply(self, text):
+        # In full duplex mode the reply is recorded as far as it was heard, see _process_turn_with_barge_in
+        if not self.full_duplex:
+            self.chat.add_msg(Role.ASSISTANT, text)
+
+    async def _process_turn(self, msg, trace):
+        self.chat.add_msg(Role.USER, msg)
+
+        speculation = None
+        if self.stream_completions and self.speculative_completions:
+            # Most input is not claimed by an extension, so don't wait for routing to ask
+            speculation = SpeculativeCompletion(self.log, self.api_client.v1_chat_completions_stream_async(self.chat.build_request()))
+
+        try:
+            await self._respond(msg, speculation, trace)
+        finally:
+            # Stops prefetching if the turn failed or was abandoned
+            if speculation:
+                await speculation.cancel()
+
+    async def _respond(self, msg, speculation, trace):
+        # Run extension middleware
+        handled_msg = await self.router.handle_voice_input_async(msg)
+        trace.mark("routed")
+
+        if speculation:
+            kept = not handled_msg
+            self.speculation_metrics.record(kept)
+            self.log.debug(f"Speculative completion {'kept' if kept else 'discarded'}: {self.speculation_metrics}")
+            if not kept:
+                # The extension changed the request, so the speculative reply is no use
+                await speculation.cancel()
+
+        if isinstance(handled_msg, DirectResponse):
+            # Deterministic reply, so skip the completion and speak it as-is
+            self.log.info(f"Responding directly with: '{handled_msg.text}'")
+            self._record_reply(handled_msg.text)
+
+            segmenter = SentenceSegmenter(self.log)
+            await self._speak(segmenter.feed(handled_msg.text) + segmenter.flush(), trace)
+            return
+
+        if handled_msg:
+            self.log.debug(f'HANDLED MSG: {handled_msg}')
+            self.chat.add_msg(Role.SYSTEM, handled_msg, ephemeral=True)
+
+        if self.stream_completions:
+            # Speak each sentence while the rest of the reply is still generating
+            if speculation and not handled_msg:
+                deltas = speculation.deltas()
+            else:
+                deltas = self.api_client.v1_chat_completions_stream_async(self.chat.build_request())
+            segmenter = SentenceSegmenter(self.log)
+            await self._speak(self._stream_chunks(segmenter, deltas, trace), trace)
+
+            self.log.info(f"Responded with: '{segmenter.text}'")
+            self._record_reply(segmenter.text)
+        else:
+            response = await self.api_client.v1_chat_completions_async(self.chat.build_request())
+            trace.mark("llm_first_token")
+            self.log.info(f"Responding with: '{response.as_text()}'")
+            self._record_reply(response.as_text())
+            await self._speak(response.as_chunks(), trace)
+
+    async def _process_turn_with_barge_in(self, msg, trace):
+        """
+        Runs a turn while still listening, and abandons it the moment the user
+        starts speaking again. Their new utterance is then routed as the next turn.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def _turn():
+            await self._process_turn(msg, trace)
+            await loop.run_in_executor(None, self.mixer.wait_for_finish)
+
+        self.mixer.take_spoken_text()
+        turn = asyncio.create_task(_turn())
+        barge_in = asyncio.create_task(self.listener.wait_for_speech_start())
+        await asyncio.wait({turn, barge_in}, return_when=asyncio.FIRST_COMPLETED)
+
+        if turn.done():
+            barge_in.cancel()
+            turn.result()
+        else:
+            self.log.info("User started speaking, abandoning the reply.")
+            trace.interrupted = True
+            # Cancelling stops any completion and speech requests still in flight
+            turn.cancel()
+            self.mixer.stop()
+            with suppress(asyncio.CancelledError):
+                await turn
+
+        # Only what the user actually heard becomes part of the conversation
+        spoken = self.mixer.take_spoken_text()
+        if spoken:
+            self.chat.add_msg(Role.ASSISTANT, spoken)
+
+    async def close(self):
+        """
+        Stops a summary refresh still in flight.
+        """
+        if self.summary_task is not None:
+            self.summary_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.summary_task
+            self.summary_task = None
+
+    async def _refresh_summary(self):
+        summary_request = self.chat.build_summary_request()
+        if not summary_request:
+            return
+        messages, covers = summary_request
+        try:
+            response = await self.api_client.v1_chat_completions_async(messages)
+            if response:
+                self.chat.set_summary(response.as_text(), covers)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Nothing awaits this task, so the error would otherwise go unnoticed; the next turn retries
+            self.log.error(f"Unable to refresh the conversation summary: {e}")
+
+
+def _flag(value, env_var, default):
+    if value is not None:
+        return value
+    return os.environ.get(env_var, default).lower() == "true"
@@ -0,0 +1,77 @@
+import asyncio
+from contextlib import suppress
+
+# Marks the end of a prefetched stream
+_DONE = object()
+
+
+class SpeculativeCompletion:
+    """
+    A streamed completion started before routing has decided whether the turn
+    needs it. Deltas are prefetched into a queue in the background and only
+    read once the speculation is kept; a discarded speculation is cancelled.
+    """
+
+    def __init__(self, logger, stream):
+        """
+        :param stream: Async iterator of completion deltas, e.g. from
+                       APIClient.v1_chat_completions_stream_async.
+        """
+        self.log = logger
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._prefetch(stream))
+
+    async def _prefetch(self, stream):
+        try:
+            async for delta in stream:
+                self.queue.put_nowait(delta)
+        except Exception as e:
+            # Raised to the reader, if the speculation is kept
+            self.queue.put_nowait(e)
+        finally:
+            self.queue.put_nowait(_DONE)
+            # Releases the connection of a cancelled stream straight away
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+
+    async def deltas(self):
+        """
+        Yields the deltas prefetched so far, then the rest as they arrive.
+        """
+        while True:
+            delta = await self.queue.get()
+            if delta is _DONE:
+                return
+            if isinstance(delta, Exception):
+                raise delta
+            yield delta
+
+    async def cancel(self):
+        self.task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.task
+
+
+class SpeculationMetrics:
+    """
+    Counts how often speculative completions were kept, versus discarded
+    because routing changed the request.
+    """
+
+    def __init__(self):
+        self.kept = 0
+        self.discarded = 0
+
+    def record(self, kept):
+        if kept:
+            self.kept += 1
+        else:
+            self.discarded += 1
+
+    @property
+    def keep_rate(self):
+        total = self.kept + self.discarded
+        return self.kept / total if total else 0.0
+
+    def __str__(self):
+        return f"{self.kept} kept, {self.discarded} discarded ({self.keep_rate:.0%} kept)"
@@ -0,0 +1,68 @@
+import asyncio
+import inspect
+import time
+
+
+class StartupOrchestrator:
+    """
+    Initializes independent services concurrently and records when each became
+    ready. Synchronous initializers run in the default executor, so a slow one,
+    e.g. microphone calibration, never holds up the others.
+    """
+
+    def __init__(self, logger):
+        self.log = logger
+        self.components = []
+        self.background_components = []
+        # Component name -> seconds from the start of `run` until it was ready
+        self.readiness = {}
+        self.failures = {}
+        self.background_tasks = set()
+
+    def add(self, name, initializer, background=False):
+        """
+        Adds a component to initialize.
+        :param initializer: Function or coroutine function that initializes the component.
+        :param background: Start the component once the others are ready, without
+                           waiting for it, e.g. to pre-warm connections.
+        """
+        (self.background_components if background else self.components).append((name, initializer))
+        return self
+
+    async def run(self):
+        """
+        Initializes every component concurrently. A component that fails is
+        logged and skipped, as the assistant can run without some of them.
+        :return: Dict of component name to seconds until it was ready.
+        """
+        started_at = time.monotonic()
+        await asyncio.gather(*(self._initialize(name, initializer, started_at) for name, initializer in self.components))
+        self.log.success(f"Services ready in {time.monotonic() - started_at:.2f}s: {self._describe(self.components)}")
+
+        for name, initializer in self.background_components:
+            task = asyncio.create_task(self._initialize(name, initializer, started_at))
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+        return self.readiness
+
+    async def _initialize(self, name, initializer, started_at):
+        try:
+            if inspect.iscoroutinefunction(initializer):
+                await initializer()
+            else:
+                await asyncio.get_running_loop().run_in_executor(None, initializer)
+        except Exception as e:
+            self.failures[name] = e
+            self.log.error(f"Failed to initialize {name}: {e}")
+            return
+        self.readiness[name] = time.monotonic() - started_at
+        self.log.debug(f"{name} ready after {self.readiness[name]:.2f}s")
+
+    def _describe(self, components):
+        described = []
+        for name, _ in components:
+            if name in self.readiness:
+                described.append(f"{name} {self.readiness[name]:.2f}s")
+            else:
+                described.append(f"{name} failed")
+        return ", ".join(described)
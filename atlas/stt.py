@@ -0,0 +1,47 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from speech_recognition import Recognizer, UnknownValueError
+
+
+class STTBackend(ABC):
+    @abstractmethod
+    def recognize(self, audio):
+        """
+        Transcribes a single utterance. Called from a worker thread.
+        This method must be implemented by the subclass.
+        :param audio: speech_recognition.AudioData for the utterance.
+        :return: The transcript, or None if no speech was recognized.
+        """
+        pass
+
+
+class GoogleSTTBackend(STTBackend):
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer if recognizer is not None else Recognizer()
+
+    def recognize(self, audio):
+        try:
+            return self.recognizer.recognize_google(audio)
+        except UnknownValueError:
+            return None
+
+
+class LocalSTTBackend(STTBackend):
+    """
+    Stand-in backend that needs no network, for tests and benchmarks. Returns the
+    given transcripts in turn, each after a simulated recognition delay.
+    """
+
+    def __init__(self, transcripts=None, delay=0):
+        self.transcripts = iter(transcripts or [])
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def recognize(self, audio):
+        with self.lock:
+            transcript = next(self.transcripts, None)
+        delay = self.delay(transcript) if callable(self.delay) else self.delay
+        if delay:
+            time.sleep(delay)
+        return transcript
@@ -0,0 +1,265 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+# Spans reported for each turn, as (name, stage it starts at, stage it ends at)
+SPANS = (
+    ("stt", "speech_end", "recognized"),
+    ("routing", "turn_start", "routed"),
+    ("llm_first_token", "routed", "llm_first_token"),
+    ("tts_first_byte", "tts_request", "tts_first_byte"),
+    ("playback_start", "tts_first_byte", "first_audio"),
+    ("time_to_first_audio", "speech_end", "first_audio"),
+    ("turn", "speech_end", "playback_end"),
+)
+# Spans that run to the end of the reply, so are cut short when the user interrupts it
+COMPLETE_TURN_SPANS = ("time_to_first_audio", "turn")
+METRIC_NAME = "atlas_turn_stage_seconds"
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+
+class TurnTrace:
+    """
+    Monotonic timestamps of the stages one turn went through, keyed by the
+    event id of the speech event that started it.
+    """
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+        # Stage name -> monotonic time it was first reached
+        self.stages = {}
+        # First clip synthesized for the reply, whose playback marks the first audio
+        self.first_clip = None
+        self.interrupted = False
+
+    def __repr__(self):
+        return f"TurnTrace({self.event_id}, stages={list(self.stages)})"
+
+    def mark(self, stage, at=None):
+        """
+        Records when a stage was reached. Only the first mark counts, so a stage
+        can be marked for every chunk or clip and still time the first one.
+        :param at: Monotonic time the stage was reached; defaults to now.
+        """
+        if stage not in self.stages:
+            self.stages[stage] = time.monotonic() if at is None else at
+
+    def add_clip(self, clip):
+        """
+        Records the speech request timings of the first clip of the reply.
+        """
+        if self.first_clip is not None:
+            return
+        self.first_clip = clip
+        # Cached clips were never requested
+        if clip.requested_at is not None:
+            self.mark("tts_request", clip.requested_at)
+            self.mark("tts_first_byte", clip.first_byte_at)
+
+    def spans(self):
+        """
+        :return: Dict of span name to seconds, for the spans whose stages were both reached.
+        """
+        spans = {}
+        for name, start, end in SPANS:
+            if start in self.stages and end in self.stages:
+                spans[name] = self.stages[end] - self.stages[start]
+        return spans
+
+    def as_dict(self):
+        origin = min(self.stages.values(), default=0.0)
+        return {
+            "event_id": str(self.event_id),
+            "interrupted": self.interrupted,
+            # Offsets from the first stage, as monotonic times mean nothing outside the process
+            "stages": {stage: round(at - origin, 4) for stage, at in self.stages.items()},
+            "spans": {name: round(seconds, 4) for name, seconds in self.spans().items()},
+        }
+
+
+class Histogram:
+    """
+    Cumulative latency histogram in the Prometheus style.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # Observations per bucket, the last counting those above every bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by interpolating within its bucket, as Prometheus'
+        histogram_quantile does.
+        :return: Seconds, or None if nothing has been observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    # Nothing is known above the last bound
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class LatencyTracer:
+    """
+    Collects a TurnTrace for every turn, and exports the spans as histograms in
+    the Prometheus text format, to a file and/or a /metrics endpoint, and each
+    trace as a line of a JSONL log.
+    """
+
+    def __init__(self, logger, trace_file=None, metrics_file=None, metrics_port=None, metrics_host=None):
+        """
+        :param trace_file: JSONL file each finished trace is appended to; defaults to ATLAS__TRACE_FILE.
+        :param metrics_file: File the histograms are written to after each turn, e.g. for the
+                             node_exporter textfile collector; defaults to ATLAS__METRICS_FILE.
+        :param metrics_port: Port to serve the histograms on at /metrics; defaults to ATLAS__METRICS_PORT.
+        :param metrics_host: Interface to serve them on; defaults to ATLAS__METRICS_HOST, or localhost only.
+        """
+        self.log = logger
+        self.trace_file = trace_file or os.environ.get("ATLAS__TRACE_FILE")
+        self.metrics_file = metrics_file or os.environ.get("ATLAS__METRICS_FILE")
+        self.metrics_port = metrics_port or int(os.environ.get("ATLAS__METRICS_PORT", 0)) or None
+        self.metrics_host = metrics_host or os.environ.get("ATLAS__METRICS_HOST", DEFAULT_METRICS_HOST)
+        self.histograms = {name: Histogram() for name, _, _ in SPANS}
+        self.runner = None
+        # A single writer thread keeps the exports ordered and off the event loop
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="latency-trace")
+        self.pending_write = None
+
+    def start(self, event):
+        """
+        Starts the trace of a turn from the speech event that began it, with the
+        stages the listener has already timed.
+        """
+        trace = TurnTrace(event.event_id)
+        trace.mark("speech_start", event.speech_started_at)
+        trace.mark("speech_end", event.speech_ended_at)
+        if event.recognized_at is not None:
+            trace.mark("recognized", event.recognized_at)
+        trace.mark("turn_start")
+        return trace
+
+    def finish(self, trace):
+        """
+        Records the spans of a finished turn and exports them.
+        """
+        # The mixer only knows when the first clip started once it has played it
+        if trace.first_clip is not None and trace.first_clip.started_at is not None:
+            trace.mark("first_audio", trace.first_clip.started_at)
+        trace.mark("playback_end")
+        spans = trace.spans()
+        for name, seconds in spans.items():
+            # An interrupted turn ended early, and would drag the percentiles down
+            if trace.interrupted and name in COMPLETE_TURN_SPANS:
+                continue
+            self.histograms[name].observe(seconds)
+
+        self.log.debug(
+            f"Turn '{trace.event_id}' latencies: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in spans.items())
+        )
+        if self.trace_file or self.metrics_file:
+            # Rendered now, so the writer exports the histograms as they were after this turn
+            line = json.dumps(trace.as_dict()) + "\n"
+            metrics = self.render_metrics() if self.metrics_file else None
+            self.pending_write = self.writer.submit(self._export, line, metrics)
+
+    def summary(self):
+        """
+        :return: p50 and p95 of time to first audio, e.g. for logging.
+        """
+        histogram = self.histograms["time_to_first_audio"]
+        if not histogram.count:
+            return "no turns traced"
+        return (
+            f"time to first audio p50 {histogram.quantile(0.5):.2f}s, "
+            f"p95 {histogram.quantile(0.95):.2f}s over {histogram.count} turns"
+        )
+
+    def render_metrics(self):
+        lines = [
+            f"# HELP {METRIC_NAME} Latency of each stage of a turn.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for name, histogram in self.histograms.items():
+            lines.extend(histogram.render(METRIC_NAME, f'stage="{name}"'))
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path):
+        _replace_file(path, self.render_metrics())
+
+    def flush(self):
+        """
+        Blocks until every finished trace has been exported.
+        """
+        if self.pending_write:
+            self.pending_write.result()
+
+    def _export(self, line, metrics):
+        # Runs on the writer thread
+        if self.trace_file:
+            with open(self.trace_file, "a") as f:
+                f.write(line)
+        if metrics is not None:
+            _replace_file(self.metrics_file, metrics)
+
+    async def serve_metrics(self):
+        """
+        Serves the histograms at /metrics, if a metrics port is configured.
+        """
+        if not self.metrics_port or self.runner:
+            return
+        from aiohttp import web
+
+        async def _metrics(request):
+            return web.Response(text=self.render_metrics(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", _metrics)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.metrics_host, self.metrics_port).start()
+        self.log.success(f"Serving metrics on {self.metrics_host}:{self.metrics_port}.")
+
+    async def close(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+        self.writer.shutdown(wait=True)
+
+
+def _replace_file(path, text):
+    # Written aside and renamed, so a scraper never reads a partial file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(text)
+    os.replace(temp_path, path)
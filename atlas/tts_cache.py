@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import aiofiles
+
+DEFAULT_MEMORY_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ClipCache:
+    """
+    Content-addressed cache of synthesized speech, keyed on everything that
+    determines the audio. Recently used clips are kept in memory, and every
+    clip is also written to disk; both tiers evict least recently used clips
+    once they exceed their byte limits.
+    """
+
+    def __init__(self, logger, cache_dir=None, memory_max_bytes=None, disk_max_bytes=None):
+        self.log = logger
+        self.cache_dir = cache_dir or os.environ.get("ATLAS__TTS_CACHE_DIR", ".cache/tts")
+        self.memory_max_bytes = _limit(memory_max_bytes, "ATLAS__TTS_CACHE_MEMORY_BYTES", DEFAULT_MEMORY_MAX_BYTES)
+        self.disk_max_bytes = _limit(disk_max_bytes, "ATLAS__TTS_CACHE_DISK_BYTES", DEFAULT_DISK_MAX_BYTES)
+
+        # key -> audio, and key -> size on disk; both ordered from least to most recently used
+        self.memory = OrderedDict()
+        self.memory_size = 0
+        self.disk = OrderedDict()
+        self.disk_size = 0
+        self.pending_writes = set()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._index_disk()
+
+    @staticmethod
+    def key(text, model, voice, response_format):
+        return hashlib.sha256(json.dumps([text, model, voice, response_format]).encode("utf-8")).hexdigest()
+
+    async def get(self, key):
+        """
+        Looks a clip up in memory, then on disk.
+        :return: The audio, or None on a miss.
+        """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return self.memory[key]
+
+        if key in self.disk:
+            try:
+                async with aiofiles.open(self._path(key), "rb") as file:
+                    data = await file.read()
+            except OSError as e:
+                self.log.warning(f"Unable to read cached clip {key}: {e}")
+                self._forget(key)
+            else:
+                self.disk.move_to_end(key)
+                os.utime(self._path(key))
+                self.disk_hits += 1
+                self._remember(key, data)
+                return data
+
+        self.misses += 1
+        return None
+
+    def put(self, key, data):
+        """
+        Caches a clip in memory right away and writes it to disk in the background.
+        """
+        self._remember(key, data)
+        if self.disk_max_bytes and len(data) <= self.disk_max_bytes and key not in self.disk:
+            task = asyncio.ensure_future(self._write(key, data))
+            self.pending_writes.add(task)
+            task.add_done_callback(self.pending_writes.discard)
+
+    async def flush(self):
+        if self.pending_writes:
+            await asyncio.gather(*self.pending_writes)
+
+    def stats(self):
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_bytes": self.memory_size,
+            "disk_bytes": self.disk_size,
+        }
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_max_bytes:
+            return
+        if key in self.memory:
+            self.memory_size -= len(self.memory.pop(key))
+        self.memory[key] = data
+        self.memory_size += len(data)
+        while self.memory_size > self.memory_max_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_size -= len(evicted)
+
+    async def _write(self, key, data):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            async with aiofiles.open(self._path(key), "wb") as file:
+                await file.write(data)
+        except OSError as e:
+            self.log.warning(f"Unable to cache clip {key} on disk: {e}")
+            return
+
+        if key in self.disk:
+            self._forget(key)
+        self.disk[key] = len(data)
+        self.disk_size += len(data)
+        while self.disk_size > self.disk_max_bytes:
+            evicted = next(iter(self.disk))
+            self._forget(evicted)
+            try:
+                os.remove(self._path(evicted))
+            except OSError as e:
+                self.log.warning(f"Unable to evict cached clip {evicted}: {e}")
+
+    def _forget(self, key):
+        self.disk_size -= self.disk.pop(key)
+
+    def _index_disk(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        # File modification times record when each clip was last used
+        entries = sorted(os.scandir(self.cache_dir), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if entry.is_file():
+                self.disk[entry.name] = entry.stat().st_size
+                self.disk_size += entry.stat().st_size
+        self.log.debug(f"Indexed {len(self.disk)} cached clips ({self.disk_size} bytes) in {self.cache_dir}")
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+
+def _limit(value, env_var, default):
+    if value is not None:
+        return value
+    return int(os.environ.get(env_var, default))
@@ -0,0 +1,134 @@
+import math
+import sys
+import wave
+from array import array
+from collections import deque
+
+# Same adaptation constants speech_recognition uses for its dynamic energy threshold
+DYNAMIC_ENERGY_DAMPING = 0.15
+DYNAMIC_ENERGY_RATIO = 1.5
+
+
+def frame_energy(frame):
+    """
+    Returns the RMS energy of a frame of 16-bit little-endian PCM audio.
+    """
+    samples = array("h", frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+def read_wav_frames(path, frame_ms=30):
+    """
+    Reads a 16-bit mono WAV file as a list of fixed-length frames, e.g. for
+    running the detector offline against recorded audio.
+    :return: Tuple of the sample rate and the list of frames.
+    """
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError(f"Expected 16-bit mono audio in '{path}'")
+        sample_rate = wav.getframerate()
+        samples_per_frame = sample_rate * frame_ms // 1000
+        frames = []
+        while True:
+            frame = wav.readframes(samples_per_frame)
+            if len(frame) < samples_per_frame * 2:
+                break
+            frames.append(frame)
+    return sample_rate, frames
+
+
+class VoiceActivityDetector:
+    """
+    Energy-based voice activity detection with endpointing. Frames are fed in one
+    at a time; leading noise is dropped, and an utterance is returned as soon as
+    enough trailing silence follows it.
+    """
+
+    def __init__(
+        self,
+        sample_rate,
+        frame_ms=30,
+        energy_threshold=300,
+        dynamic_energy_threshold=True,
+        min_speech_ms=150,
+        trailing_silence_ms=500,
+        pre_roll_ms=300,
+        max_utterance_ms=15000,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.samples_per_frame = sample_rate * frame_ms // 1000
+        self.energy_threshold = energy_threshold
+        self.dynamic_energy_threshold = dynamic_energy_threshold
+
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.trailing_silence_frames = max(1, trailing_silence_ms // frame_ms)
+        self.max_utterance_frames = max_utterance_ms // frame_ms
+        self.pre_roll = deque(maxlen=max(self.min_speech_frames, pre_roll_ms // frame_ms))
+        self.reset()
+
+    def reset(self):
+        self.pre_roll.clear()
+        self.utterance = None
+        self.speech_run = 0
+        self.silence_run = 0
+
+    def is_speech(self, frame):
+        """
+        Classifies a frame, adapting the threshold to the noise floor on non-speech frames.
+        """
+        energy = frame_energy(frame)
+        if energy > self.energy_threshold:
+            return True
+        if self.dynamic_energy_threshold:
+            self.adapt(energy)
+        return False
+
+    def adapt(self, energy):
+        damping = DYNAMIC_ENERGY_DAMPING ** (self.frame_ms / 1000)
+        target = energy * DYNAMIC_ENERGY_RATIO
+        self.energy_threshold = self.energy_threshold * damping + target * (1 - damping)
+
+    def calibrate(self, frames):
+        """
+        Sets the threshold from frames of ambient noise.
+        """
+        for frame in frames:
+            self.adapt(frame_energy(frame))
+
+    def process(self, frame):
+        """
+        Feeds one frame to the detector.
+        :param frame: Raw 16-bit PCM audio, `samples_per_frame` samples long.
+        :return: The audio of a complete utterance once it has ended, otherwise None.
+        """
+        speech = self.is_speech(frame)
+
+        if self.utterance is None:
+            self.pre_roll.append(frame)
+            self.speech_run = self.speech_run + 1 if speech else 0
+            if self.speech_run >= self.min_speech_frames:
+                # Keep the audio leading up to the trigger so the first syllable is not cut
+                self.utterance = list(self.pre_roll)
+                self.silence_run = 0
+            return None
+
+        self.utterance.append(frame)
+        self.silence_run = 0 if speech else self.silence_run + 1
+        if self.silence_run >= self.trailing_silence_frames or len(self.utterance) >= self.max_utterance_frames:
+            utterance = b"".join(self.utterance)
+            self.reset()
+            return utterance
+        return None
+
+    def flush(self):
+        """
+        Returns any utterance still in progress, e.g. when the input has ended.
+        """
+        utterance = b"".join(self.utterance) if self.utterance else None
+        self.reset()
+        return utterance
@@ -0,0 +1,77 @@
+"""
+Per-utterance slot extraction cost as the number of grammars grows.
+
+Compares the combined GrammarEngine against trying each grammar in turn,
+both with the per-call re.compile the extensions used to do and with
+precompiled patterns.
+
+    python benchmarks/bench_grammar.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from atlas.grammar import GrammarEngine
+
+GRAMMAR_COUNTS = [5, 10, 25, 50, 100, 200]
+UTTERANCES = [
+    "add oat milk to my shopping list",
+    "remove sponges from the shopping list",
+    "what is the weather like in Leeds tomorrow?",
+    "could you download me the movie Iron Man",
+    "tell me a joke about pirates",
+]
+
+
+def _grammars(count):
+    # The real list grammars, padded out with distinct grammars of the same shape
+    grammars = [
+        ("add", r"\badd (?P<item>.*?) to (?:the |my )?(?P<list>.*?) list"),
+        ("remove", r"\bremove (?P<item>.*?) from (?:the |my )?(?P<list>.*?) list"),
+    ]
+    for index in range(count - len(grammars)):
+        grammars.append((f"verb{index}", rf"\bverb{index} (?P<item>.*?) (?:to|from) (?:the |my )?(?P<list>.*?) thing"))
+    return grammars
+
+
+def _per_call_compile(grammars, utterance):
+    for action, grammar in grammars:
+        match = re.compile(grammar, re.IGNORECASE).search(utterance)
+        if match:
+            return action, match.groupdict()
+    return None, {}
+
+
+def _precompiled(patterns, utterance):
+    for action, pattern in patterns:
+        match = pattern.search(utterance)
+        if match:
+            return action, match.groupdict()
+    return None, {}
+
+
+def _per_utterance_us(func, number):
+    seconds = timeit.timeit(lambda: [func(utterance) for utterance in UTTERANCES], number=number)
+    return seconds / (number * len(UTTERANCES)) * 1e6
+
+
+def main(number=200):
+    print(f"{'grammars':>8} {'re.compile per call':>20} {'precompiled loop':>17} {'GrammarEngine':>14}  (us per utterance)")
+    for count in GRAMMAR_COUNTS:
+        grammars = _grammars(count)
+        patterns = [(action, re.compile(grammar, re.IGNORECASE)) for action, grammar in grammars]
+        engine = GrammarEngine()
+        for action, grammar in grammars:
+            engine.register(action, grammar)
+        engine.compile()
+
+        per_call = _per_utterance_us(lambda utterance: _per_call_compile(grammars, utterance), number)
+        precompiled = _per_utterance_us(lambda utterance: _precompiled(patterns, utterance), number)
+        combined = _per_utterance_us(engine.match, number)
+        print(f"{count:>8} {per_call:>20.1f} {precompiled:>17.1f} {combined:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
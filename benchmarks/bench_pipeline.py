@@ -0,0 +1,205 @@
+"""
+End-to-end latency of the turn pipeline against local stand-ins for OpenAI,
+Radarr and OpenWeather (see stand_ins.py), with pygame's dummy audio driver
+standing in for the sound card.
+
+Each turn starts from an already recognized utterance, so STT is left out;
+time to first audio runs from the end of speech to the first clip starting
+to play. The utterances cycle through a plain chat turn and ones routed to
+the weather and radarr extensions.
+
+    python benchmarks/bench_pipeline.py --turns 30 --jitter 0.05 --output after.json
+    python benchmarks/bench_pipeline.py --turns 30 --jitter 0.05 --baseline after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from loguru import logger as log
+from benchmarks.stand_ins import StandIns
+
+UTTERANCES = [
+    "tell me something interesting",
+    "what is the weather like in Leeds tomorrow?",
+    "download the movie Extraction",
+]
+# Spans reported, in pipeline order
+REPORTED_SPANS = ["routing", "llm_first_token", "tts_first_byte", "playback_start", "time_to_first_audio", "turn"]
+
+
+async def measure(stand_ins, turns, warmup_turns=len(UTTERANCES), utterances=UTTERANCES, **pipeline_options):
+    """
+    Runs turns through a TurnPipeline wired to the stand-ins, which must already be started.
+    :param warmup_turns: Turns run first and left out of the results, so the
+                         extensions are imported and connections are open.
+    :param pipeline_options: Passed on to TurnPipeline, e.g. stream_completions.
+    :return: Dict of the results, see `summarize`.
+    """
+    environment = dict(stand_ins.environment(), ATLAS__EXTENSIONS="weather,radarr")
+    previous = {key: os.environ.get(key) for key in environment}
+    os.environ.update(environment)
+    try:
+        return await _run_turns(turns, warmup_turns, utterances, pipeline_options)
+    finally:
+        # Leave the environment as it was for whatever imported this
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+async def _run_turns(turns, warmup_turns, utterances, pipeline_options):
+    # Imported once the environment points at the stand-ins
+    from atlas.audio_mixer import Mixer
+    from atlas.chat_context import Chat
+    from atlas.extension_loader import discover_extensions
+    from atlas.extension_router import ExtensionRouter
+    from atlas.listener import Listener, SpeechEvent
+    from atlas.openai_api_client import APIClient
+    from atlas.pipeline import TurnPipeline
+    from atlas.tracing import LatencyTracer
+
+    mixer = Mixer(log)
+    mixer.init_mixer(log)
+    if mixer.channel is None:
+        raise RuntimeError("No audio driver available, even with SDL_AUDIODRIVER=dummy")
+    mixer_thread = threading.Thread(target=mixer.start_auto_play_loop, daemon=True)
+    mixer_thread.start()
+
+    api_client = APIClient(log)
+    await api_client.open_session()
+    router = ExtensionRouter(log)
+    for extension in discover_extensions(log):
+        router.add_extension(extension)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        chat = Chat(log, journal_path=os.path.join(journal_dir, "chat_history.jsonl"),
+                    preload_path=os.path.join(ROOT, "context_preload"))
+        # Never started, so there is no microphone; the pipeline only pauses and resumes it
+        listener = Listener(log)
+        pipeline = TurnPipeline(log, api_client, router, chat, mixer, listener, LatencyTracer(log), **pipeline_options)
+        try:
+            traces = []
+            started_at = None
+            for index in range(warmup_turns + turns):
+                if index == warmup_turns:
+                    started_at = time.monotonic()
+                now = time.monotonic()
+                event = SpeechEvent(now, now)
+                event.text, event.recognized_at = utterances[index % len(utterances)], now
+                trace = await pipeline.handle(event)
+                if index >= warmup_turns:
+                    traces.append(trace)
+            elapsed = time.monotonic() - started_at
+        finally:
+            if pipeline.summary_task:
+                await pipeline.summary_task
+            mixer.stop_auto_play_loop()
+            mixer_thread.join()
+            await api_client.close_session()
+            await router.close()
+            chat.close()
+            listener.stt_pool.shutdown()
+    return summarize(traces, elapsed)
+
+
+def summarize(traces, elapsed):
+    """
+    :return: Dict of the turn count and throughput, and the p50, p95 and mean of each span in seconds.
+    """
+    spans = {}
+    for name in REPORTED_SPANS:
+        samples = [trace.spans()[name] for trace in traces if name in trace.spans()]
+        if not samples:
+            continue
+        spans[name] = {
+            "p50": statistics.median(samples),
+            "p95": _percentile(samples, 0.95),
+            "mean": statistics.mean(samples),
+            "samples": len(samples),
+        }
+    return {
+        "turns": len(traces),
+        "turns_per_minute": len(traces) / elapsed * 60 if elapsed else 0.0,
+        "spans": spans,
+    }
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def report(results, baseline=None):
+    lines = [f"{results['turns']} turns, {results['turns_per_minute']:.1f} turns/minute"]
+    if baseline:
+        lines[0] += f" (baseline {baseline['turns_per_minute']:.1f})"
+    lines.append(f"{'span':>20} | {'p50 [ms]':>9} | {'p95 [ms]':>9} | {'mean [ms]':>9}")
+    for name, stats in results["spans"].items():
+        line = f"{name:>20} | {stats['p50'] * 1000:>9.1f} | {stats['p95'] * 1000:>9.1f} | {stats['mean'] * 1000:>9.1f}"
+        before = (baseline or {}).get("spans", {}).get(name)
+        if before:
+            line += f" | p50 {(stats['p50'] - before['p50']) * 1000:+.1f}ms, p95 {(stats['p95'] - before['p95']) * 1000:+.1f}ms"
+        lines.append(line)
+    print("\n".join(lines))
+
+
+async def main(args):
+    stand_ins = StandIns(
+        chat_latency=args.chat_latency, token_interval=args.token_interval, speech_latency=args.speech_latency,
+        clip_seconds=args.clip_seconds, radarr_latency=args.radarr_latency, weather_latency=args.weather_latency,
+        jitter=args.jitter, seed=args.seed,
+    )
+    await stand_ins.start()
+    try:
+        results = await measure(
+            stand_ins, args.turns, stream_completions=not args.no_stream, tts_concurrency=args.tts_concurrency,
+            speculative_completions=args.speculative, full_duplex=False,
+        )
+    finally:
+        await stand_ins.close()
+    results["settings"] = vars(args)
+    results["requests"] = stand_ins.requests
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--chat-latency", type=float, default=0.3, help="seconds to the first completion token")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="seconds between completion tokens")
+    parser.add_argument("--speech-latency", type=float, default=0.25, help="seconds to the start of a speech response")
+    parser.add_argument("--clip-seconds", type=float, default=0.2, help="length of each synthesized clip")
+    parser.add_argument("--radarr-latency", type=float, default=0.05)
+    parser.add_argument("--weather-latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of every latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tts-concurrency", type=int, default=3)
+    parser.add_argument("--no-stream", action="store_true", help="wait for whole completions")
+    parser.add_argument("--speculative", action="store_true", help="start completions while routing")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results written with --output")
+    args = parser.parse_args()
+
+    log.remove()
+    log.add(sys.stderr, level="WARNING")
+    results = asyncio.run(main(args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,188 @@
+"""
+Local stand-ins for the services a turn calls: the OpenAI chat completion and
+speech endpoints, Radarr's movie lookup and OpenWeather's forecast. Each
+response is delayed by a latency drawn from a seeded normal distribution, so
+runs are reproducible offline and comparable between commits.
+"""
+import asyncio
+import io
+import json
+import os
+import random
+import time
+import wave
+from aiohttp import web
+
+EXAMPLE_MOVIE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example-response.json")
+REPLY = (
+    "Here is a short reply from the stand-in model. "
+    "It has a few sentences, so the reply is spoken while it is still streaming. "
+    "That is all for now."
+)
+SAMPLE_RATE = 22050
+
+
+class Latency:
+    """
+    Delay of a response, in seconds: normally distributed around `mean` with a
+    standard deviation of `jitter`, and never negative.
+    """
+
+    def __init__(self, mean, jitter=0.0, rng=None):
+        self.mean = mean
+        self.jitter = jitter
+        self.rng = rng or random.Random(0)
+
+    def sample(self):
+        if not self.jitter:
+            return self.mean
+        return max(0.0, self.rng.gauss(self.mean, self.jitter))
+
+    async def wait(self):
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class StandIns:
+    """
+    Serves every stand-in from one local aiohttp server.
+
+        stand_ins = StandIns(chat_latency=0.3, jitter=0.05)
+        base_url = await stand_ins.start()
+        ...
+        await stand_ins.close()
+    """
+
+    def __init__(self, chat_latency=0.3, token_interval=0.02, speech_latency=0.25, clip_seconds=0.2,
+                 radarr_latency=0.05, weather_latency=0.1, jitter=0.0, seed=0, reply=REPLY):
+        """
+        :param chat_latency: Seconds before the first completion token, or the whole completion when not streamed.
+        :param token_interval: Seconds between streamed completion tokens.
+        :param speech_latency: Seconds before a speech response starts.
+        :param clip_seconds: Length of the silent audio returned for each speech request.
+        :param jitter: Standard deviation of every latency, in seconds.
+        :param seed: Seeds the latency jitter, so runs with the same settings see the same delays.
+        """
+        rng = random.Random(seed)
+        self.chat_latency = Latency(chat_latency, jitter, rng)
+        self.token_interval = token_interval
+        self.speech_latency = Latency(speech_latency, jitter, rng)
+        self.radarr_latency = Latency(radarr_latency, jitter, rng)
+        self.weather_latency = Latency(weather_latency, jitter, rng)
+        self.reply = reply
+        self.clip = _silence(clip_seconds)
+        with open(EXAMPLE_MOVIE_PATH, "r") as f:
+            self.movie = json.load(f)
+        # Route -> number of requests served
+        self.requests = {}
+        self.runner = None
+        self.base_url = None
+
+    async def start(self, port=0):
+        """
+        Starts serving on localhost.
+        :param port: Port to listen on; an ephemeral port by default.
+        :return: The base URL, e.g. for ATLAS__OPENAI_BASE_URL.
+        """
+        app = web.Application()
+        app.router.add_route("HEAD", "/v1/models", self._head)
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/audio/speech", self._speech)
+        app.router.add_get("/api/v3/movie/lookup", self._movie_lookup)
+        app.router.add_post("/api/v3/movie", self._add_movie)
+        app.router.add_get("/data/2.5/forecast", self._forecast)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    def environment(self):
+        """
+        :return: Environment variables pointing atlas and its extensions at the stand-ins.
+        """
+        return {
+            "ATLAS__OPENAI_BASE_URL": self.base_url,
+            "RADARR_EXT__BASE_URL": self.base_url,
+            "RADARR_EXT__API_KEY": "stand-in",
+            "WEATHER_EXT__BASE_URL": f"{self.base_url}/data/2.5/forecast",
+            "WEATHER_EXT__API_KEY": "stand-in",
+        }
+
+    async def close(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def _count(self, request):
+        self.requests[request.path] = self.requests.get(request.path, 0) + 1
+
+    async def _head(self, request):
+        return web.Response()
+
+    async def _chat_completions(self, request):
+        self._count(request)
+        body = await request.json()
+        await self.chat_latency.wait()
+        if not body.get("stream"):
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": self.reply}}]})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for index, token in enumerate(self.reply.split(" ")):
+            if index:
+                await asyncio.sleep(self.token_interval)
+                token = " " + token
+            event = {"choices": [{"delta": {"content": token}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _speech(self, request):
+        self._count(request)
+        await request.json()
+        await self.speech_latency.wait()
+        return web.Response(body=self.clip, content_type="audio/wav")
+
+    async def _movie_lookup(self, request):
+        self._count(request)
+        await self.radarr_latency.wait()
+        return web.json_response([self.movie])
+
+    async def _add_movie(self, request):
+        self._count(request)
+        await self.radarr_latency.wait()
+        return web.json_response(await request.json(), status=201)
+
+    async def _forecast(self, request):
+        self._count(request)
+        await self.weather_latency.wait()
+        now = int(time.time())
+        intervals = int(request.query.get("cnt", 40))
+        return web.json_response({"list": [_forecast_interval(now + index * 3 * 3600) for index in range(intervals)]})
+
+
+def _forecast_interval(timestamp):
+    return {
+        "dt": timestamp,
+        "main": {"temp": 12.3, "humidity": 71},
+        "weather": [{"description": "light rain"}],
+        "wind": {"speed": 4.2, "deg": 225, "gust": 8.1},
+        "clouds": {"all": 90},
+        "rain": {"3h": 0.4},
+    }
+
+
+def _silence(seconds, rate=SAMPLE_RATE):
+    # WAV rather than MP3, so no encoder is needed; pygame detects the format from the data
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\0\0" * int(rate * seconds))
+    return buffer.getvalue()
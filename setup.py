@@ -7,6 +7,7 @@ setup(
     author_email='nicholastolhurst@outlook.com',
     description='A voice assistant project',
     packages=find_packages(),
+    package_data={'atlas': ['extensions/*/manifest.json']},
     install_requires=[
         'aiohttp',
         'aiofiles',
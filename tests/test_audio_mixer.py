@@ -0,0 +1,67 @@
+import io
+import os
+import threading
+import time
+import wave
+import pytest
+from loguru import logger as log
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+from atlas.audio_clip import AudioClip
+from atlas.audio_mixer import Mixer
+
+
+def _silence(seconds, rate=22050):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\0\0" * int(rate * seconds))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def mixer():
+    mixer = Mixer(log)
+    mixer.init_mixer(log)
+    if mixer.channel is None:
+        pytest.skip("No audio device available")
+    thread = threading.Thread(target=mixer.start_auto_play_loop, daemon=True)
+    thread.start()
+    yield mixer
+    mixer.stop_auto_play_loop()
+    thread.join()
+    pygame.mixer.quit()
+
+def test_stop_drops_pending_clips_and_keeps_what_was_heard(mixer):
+    for text in ["First.", "Second.", "Third."]:
+        mixer.add_clip(AudioClip(_silence(0.3), text=text, format="wav"))
+    time.sleep(0.1)
+    mixer.stop()
+    assert not mixer.is_playing()
+    assert mixer.take_spoken_text() == "First."
+
+    # The loop carries on with the next reply
+    mixer.add_clip(AudioClip(_silence(0.1), text="Fourth.", format="wav"))
+    assert mixer.wait_for_finish(timeout=2)
+    assert mixer.take_spoken_text() == "Fourth."
+    assert mixer.take_spoken_text() == ""
+
+def test_add_clip_does_not_wait_for_a_clip_being_decoded(mixer, monkeypatch):
+    decode = pygame.mixer.Sound
+
+    def slow_decode(file):
+        time.sleep(0.3)
+        return decode(file)
+    monkeypatch.setattr(pygame.mixer, "Sound", slow_decode)
+
+    mixer.add_clip(AudioClip(_silence(0.1), text="First.", format="wav"))
+    time.sleep(0.05)
+    started_at = time.monotonic()
+    mixer.add_clip(AudioClip(_silence(0.1), text="Second.", format="wav"))
+    assert time.monotonic() - started_at < 0.1
+    assert mixer.wait_for_finish(timeout=3)
+    assert mixer.take_spoken_text() == "First. Second."
@@ -0,0 +1,112 @@
+import json
+from loguru import logger as log
+from atlas import chat_context
+from atlas.chat_context import Chat, Role
+
+
+def _preload(tmp_path):
+    path = tmp_path / "context_preload"
+    path.write_text("Call me Nick.")
+    return str(path)
+
+
+def test_messages_are_appended_to_journal(tmp_path):
+    journal = tmp_path / "chat_history.jsonl"
+    chat = Chat(log, journal_path=str(journal), preload_path=_preload(tmp_path))
+    chat.add_msg(Role.USER, "hello")
+    chat.add_msg(Role.ASSISTANT, "hi")
+    chat.close()
+    lines = journal.read_text().splitlines()
+    assert [json.loads(line)["content"] for line in lines] == ["hello", "hi"]
+
+def test_startup_loads_preload_and_journal_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_context, "HISTORY_TAIL_LENGTH", 3)
+    journal = tmp_path / "chat_history.jsonl"
+    journal.write_text("".join(json.dumps({"role": "user", "content": str(i)}) + "\n" for i in range(10)))
+    chat = Chat(log, journal_path=str(journal), preload_path=_preload(tmp_path))
+    assert chat.context[0]["content"] == "Call me Nick."
+    assert [msg["content"] for msg in chat.context[chat.context_preload_length:]] == ["7", "8", "9"]
+
+def test_legacy_history_is_migrated_without_preload(tmp_path):
+    preload_path = _preload(tmp_path)
+    legacy = [
+        {"role": "user", "content": "Call me Nick."},
+        {"role": "assistant", "content": "Ok"},
+        {"role": "user", "content": "hello"},
+    ]
+    (tmp_path / "chat_history.json").write_text(json.dumps(legacy))
+    chat = Chat(log, journal_path=str(tmp_path / "chat_history.jsonl"), preload_path=preload_path)
+    assert chat.context == legacy
+
+def test_compaction_archives_old_messages(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_context, "JOURNAL_COMPACT_SIZE", 200)
+    monkeypatch.setattr(chat_context, "JOURNAL_KEEP_LENGTH", 2)
+    journal = tmp_path / "chat_history.jsonl"
+    chat = Chat(log, journal_path=str(journal), preload_path=_preload(tmp_path))
+    for i in range(10):
+        chat.add_msg(Role.USER, f"message {i}")
+    chat.close()
+    journaled = journal.read_text().splitlines()
+    archived = (tmp_path / "chat_history.archive.jsonl").read_text().splitlines()
+    assert len(journaled) + len(archived) == 10
+    assert json.loads(journaled[-1])["content"] == "message 9"
+    assert json.loads(archived[0])["content"] == "message 0"
+
+def test_compaction_only_reruns_after_the_journal_grows_again(tmp_path, monkeypatch):
+    # The kept messages alone are over the threshold
+    monkeypatch.setattr(chat_context, "JOURNAL_COMPACT_SIZE", 400)
+    monkeypatch.setattr(chat_context, "JOURNAL_KEEP_LENGTH", 5)
+    chat = Chat(log, journal_path=str(tmp_path / "chat_history.jsonl"), preload_path=_preload(tmp_path))
+    compactions = []
+    compact = chat.compact
+    monkeypatch.setattr(chat, "compact", lambda: compactions.append(compact()))
+    for i in range(30):
+        chat.add_msg(Role.USER, f"message {i:03} with enough words to take up space")
+        chat.flush()
+    chat.close()
+    assert 2 <= len(compactions) <= 8
+
+def _chat_with_history(tmp_path, count):
+    chat = Chat(log, journal_path=str(tmp_path / "chat_history.jsonl"), preload_path=_preload(tmp_path))
+    for i in range(count):
+        chat.add_msg(Role.USER if i % 2 == 0 else Role.ASSISTANT, f"message number {i:03}")
+    return chat
+
+def test_request_keeps_preload_and_recent_messages_under_budget(tmp_path):
+    chat = _chat_with_history(tmp_path, 50)
+    request = chat.build_request(token_budget=100)
+    assert request[0]["content"] == "Call me Nick."
+    assert request[-1]["content"] == "message number 049"
+    assert sum(chat_context.estimate_tokens(msg) for msg in request) <= 100
+    assert len(request) < 52
+
+def test_ephemeral_messages_expire_after_their_turn(tmp_path):
+    chat = _chat_with_history(tmp_path, 0)
+    chat.add_msg(Role.USER, "weather?")
+    chat.add_msg(Role.SYSTEM, "It is sunny.", ephemeral=True)
+    assert {"role": "system", "content": "It is sunny."} in chat.build_request()
+    chat.add_msg(Role.ASSISTANT, "Sunny.")
+    chat.add_msg(Role.USER, "thanks")
+    request = chat.build_request()
+    assert all(msg["content"] != "It is sunny." for msg in request)
+    assert all(set(msg) == {"role", "content"} for msg in request)
+
+def test_current_turn_is_kept_even_over_budget(tmp_path):
+    chat = _chat_with_history(tmp_path, 10)
+    question = "please answer this long question " * 40
+    chat.add_msg(Role.USER, question)
+    chat.add_msg(Role.SYSTEM, "It is sunny.", ephemeral=True)
+    request = chat.build_request(token_budget=50)
+    assert request[0]["content"] == "Call me Nick."
+    assert [msg["content"] for msg in request[-2:]] == [question, "It is sunny."]
+    assert all(not msg["content"].startswith("message number") for msg in request)
+
+def test_dropped_messages_are_folded_into_summary(tmp_path):
+    chat = _chat_with_history(tmp_path, 50)
+    chat.build_request(token_budget=100)
+    messages, covers = chat.build_summary_request()
+    assert "message number 000" in messages[-1]["content"]
+    chat.set_summary("Nick said lots of numbered messages.", covers)
+    request = chat.build_request(token_budget=100)
+    assert request[2]["content"].endswith("Nick said lots of numbered messages.")
+    assert request[-1]["content"] == "message number 049"
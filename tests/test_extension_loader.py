@@ -0,0 +1,87 @@
+import asyncio
+import importlib
+import json
+import sys
+from loguru import logger as log
+from atlas.extension_loader import discover_extensions
+from atlas.extension_router import ExtensionRouter
+from atlas.import_profile import ImportTimer
+
+EXTENSION_MODULE = '''
+from atlas.extension_router import AtlasExtension
+
+class EchoExtension(AtlasExtension):
+    def __init__(self, logger):
+        super().__init__()
+
+    def process_voice_input(self, voice_input):
+        return f"echo: {voice_input}"
+'''
+
+
+def _write_extension(tmp_path, monkeypatch, module_name):
+    (tmp_path / f"{module_name}.py").write_text(EXTENSION_MODULE)
+    extension_dir = tmp_path / "extensions" / "echo"
+    extension_dir.mkdir(parents=True)
+    (extension_dir / "manifest.json").write_text(json.dumps({
+        "name": "echo", "module": module_name, "class": "EchoExtension", "trigger_phrases": ["echo"],
+    }))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return str(tmp_path / "extensions")
+
+def test_extensions_are_imported_when_first_routed_to(tmp_path, monkeypatch):
+    extensions_dir = _write_extension(tmp_path, monkeypatch, "lazy_echo_extension")
+    router = ExtensionRouter(log)
+    for extension in discover_extensions(log, extensions_dir):
+        router.add_extension(extension)
+
+    assert asyncio.run(router.handle_voice_input_async("hello there")) is None
+    assert "lazy_echo_extension" not in sys.modules
+    assert asyncio.run(router.handle_voice_input_async("echo this")) == "echo: echo this"
+    assert "lazy_echo_extension" in sys.modules
+    assert router.extensions[0].name == "EchoExtension"
+
+def test_discovery_can_be_limited_to_enabled_extensions(tmp_path, monkeypatch):
+    extensions_dir = _write_extension(tmp_path, monkeypatch, "disabled_echo_extension")
+    assert discover_extensions(log, extensions_dir, enabled=["weather"]) == []
+
+def test_manifests_match_the_extensions_they_describe():
+    for extension in discover_extensions(log):
+        module = importlib.import_module(extension.manifest["module"])
+        extension_class = getattr(module, extension.manifest["class"])
+        assert extension.trigger_phrases == extension_class.trigger_phrases
+
+def test_import_timer_records_self_and_cumulative_time(tmp_path, monkeypatch):
+    (tmp_path / "timed_parent.py").write_text("import time, timed_child\ntime.sleep(0.02)\n")
+    (tmp_path / "timed_child.py").write_text("import time\ntime.sleep(0.02)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    timer = ImportTimer().install()
+    try:
+        import timed_parent
+    finally:
+        timer.uninstall()
+
+    own, cumulative = timer.timings["timed_parent"]
+    assert own >= 0.02 and cumulative >= 0.04
+    assert timer.timings["timed_child"][1] >= 0.02
+    assert timer.total == cumulative
+    assert timed_parent.__loader__.__class__.__name__ == "SourceFileLoader"
+
+def test_prewarm_connects_to_the_manifest_host_without_loading(tmp_path, monkeypatch):
+    extensions_dir = _write_extension(tmp_path, monkeypatch, "prewarmed_echo_extension")
+    extension = discover_extensions(log, extensions_dir)[0]
+    prewarmed = []
+
+    class FakeHTTPClient:
+        async def prewarm(self, url):
+            prewarmed.append(url)
+    extension.http = FakeHTTPClient()
+
+    asyncio.run(extension.prewarm())
+    extension.manifest["prewarm"] = {"url_env": "ECHO_EXT__BASE_URL", "url": "http://echo.example"}
+    asyncio.run(extension.prewarm())
+    monkeypatch.setenv("ECHO_EXT__BASE_URL", "http://localhost:7878")
+    asyncio.run(extension.prewarm())
+    assert prewarmed == ["http://echo.example", "http://localhost:7878"]
+    assert extension.extension is None
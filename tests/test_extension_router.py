@@ -1,5 +1,8 @@
+import asyncio
+import threading
 import pytest
-from atlas.extension_router import AtlasExtension, ExtensionRouter
+from loguru import logger as log
+from atlas.extension_router import AtlasExtension, AsyncAtlasExtension, DirectResponse, ExtensionRouter
 
 class TestAtlasExtension(AtlasExtension):
     def __init__(self):
@@ -25,7 +28,7 @@ class TestAtlasExtension(AtlasExtension):
 
 @pytest.fixture
 def router():
-    router = ExtensionRouter()
+    router = ExtensionRouter(log)
     test_extension = TestAtlasExtension()
     router.add_extension(test_extension)
     return router
@@ -58,18 +61,99 @@ def test_can_handle_input():
     
 def test_is_context_complete():
     extension = TestAtlasExtension()
-    router = ExtensionRouter()
+    router = ExtensionRouter(log)
     router.add_extension(extension)
     response = router.route_voice_input('test with complete context')
     assert extension.is_context_complete()
     
 def test_is_context_complete_without_context():
     extension = TestAtlasExtension()
-    router = ExtensionRouter()
+    router = ExtensionRouter(log)
     router.add_extension(extension)
     response = router.route_voice_input('test without complete c0nt3xt')
     assert not extension.is_context_complete()
     
 def test_prompt_for_missing_context():
     extension = TestAtlasExtension()
-    assert extension.prompt_for_missing_context() == "Missing context."
\ No newline at end of file
+    assert extension.prompt_for_missing_context() == "Missing context."
+
+def test_direct_response_formats_template():
+    response = DirectResponse("I've added {item} to the {list} list.", item="milk", list="shopping")
+    assert response.text == "I've added milk to the shopping list."
+    assert str(response) == response.text
+
+
+class ListsExtension(AtlasExtension):
+    trigger_phrases = ['list', 'lists']
+
+    def process_voice_input(self, voice_input):
+        return "lists"
+
+class MoviesExtension(AtlasExtension):
+    trigger_phrases = {'download': 1, 'download the movie': 3}
+
+    def process_voice_input(self, voice_input):
+        return "movies"
+
+def test_trigger_phrases_match_whole_words_only():
+    router = ExtensionRouter(log)
+    router.add_extension(ListsExtension())
+    assert router.route_voice_input('add milk to my shopping list') == "lists"
+    assert router.route_voice_input('put on my playlist') is None
+
+def test_highest_scoring_extension_wins():
+    router = ExtensionRouter(log)
+    router.add_extension(ListsExtension())
+    router.add_extension(MoviesExtension())
+    assert router.route_voice_input('download the movie from my watch list') == "movies"
+
+def test_tied_scores_ask_for_disambiguation_and_follow_up_routes():
+    router = ExtensionRouter(log)
+    router.add_extension(ListsExtension())
+    router.add_extension(MoviesExtension())
+    response = router.route_voice_input('download my list')
+    assert response.startswith("Did you mean")
+    assert router.route_voice_input('the list one') == "lists"
+
+def test_routing_decisions_are_cached():
+    router = ExtensionRouter(log)
+    extension = ListsExtension()
+    router.add_extension(extension)
+    router.match_extensions('Read my list.')
+    assert router.match_extensions('read my LIST') == [extension]
+    assert len(router.routing_cache) == 1
+
+
+class WeatherExtension(AsyncAtlasExtension):
+    trigger_phrases = ['weather']
+
+    async def process_voice_input(self, voice_input):
+        await asyncio.sleep(0)
+        return "weather"
+
+class ThreadExtension(AtlasExtension):
+    trigger_phrases = ['thread']
+
+    def process_voice_input(self, voice_input):
+        return threading.current_thread()
+
+def test_async_router_awaits_async_extensions_and_injects_http_client():
+    router = ExtensionRouter(log)
+    extension = WeatherExtension()
+    router.add_extension(extension)
+    assert extension.http is router.http
+    assert asyncio.run(router.handle_voice_input_async('what is the weather')) == "weather"
+
+def test_async_router_runs_sync_extensions_off_the_event_loop():
+    router = ExtensionRouter(log)
+    router.add_extension(ThreadExtension())
+    router.add_extension(ListsExtension())
+    assert asyncio.run(router.handle_voice_input_async('which thread')) is not threading.current_thread()
+    assert asyncio.run(router.handle_voice_input_async('read my list')) == "lists"
+    assert asyncio.run(router.handle_voice_input_async('nothing')) is None
+
+def test_sync_router_rejects_async_extensions():
+    router = ExtensionRouter(log)
+    router.add_extension(WeatherExtension())
+    with pytest.raises(TypeError):
+        router.route_voice_input('what is the weather')
@@ -0,0 +1,61 @@
+from loguru import logger as log
+from atlas.grammar import GrammarEngine
+from atlas.extensions.lists.ext.lists_ctx import Context
+from atlas.extensions.radarr.ext.utils import extract_search_term
+
+
+def test_match_returns_action_and_slots():
+    engine = GrammarEngine()
+    engine.register('add', r"\badd (?P<item>.*?) to (?:the )?(?P<list>.*?) list")
+    engine.register('remove', r"\bremove (?P<item>.*?) from (?:the )?(?P<list>.*?) list")
+    assert engine.match("Please REMOVE eggs from the shopping list") == ('remove', {'item': 'eggs', 'list': 'shopping'})
+    assert engine.match("what time is it") == (None, {})
+
+def test_leftmost_match_wins_then_registration_order():
+    engine = GrammarEngine()
+    engine.register('late', r"\bremove (?P<item>\w+)")
+    engine.register('early', r"\badd (?P<item>\w+)")
+    engine.register('unanchored', r"(?P<item>milk)")
+    engine.register('shadowed', r"\badd (?P<thing>\w+)")
+    assert engine.match("add milk then remove eggs") == ('early', {'item': 'milk'})
+    assert engine.match("some milk, then remove eggs") == ('unanchored', {'item': 'milk'})
+
+def test_keywords_sharing_a_prefix():
+    engine = GrammarEngine()
+    engine.register('create', r"\bcreate(?: me)? a (?P<list>\w+) list")
+    engine.register('creature', r"\bcreature (?P<name>\w+)")
+    engine.register('optional', r"\bcolou?r (?P<colour>\w+)")
+    assert engine.match("creature Bob") == ('creature', {'name': 'Bob'})
+    assert engine.match("create me a todo list") == ('create', {'list': 'todo'})
+    assert engine.match("color red") == ('optional', {'colour': 'red'})
+
+def test_top_level_alternation_is_not_anchored_on_its_first_branch():
+    engine = GrammarEngine()
+    engine.register('forecast', r"weather|forecast (?P<when>\w+)")
+    engine.register('grouped', r"\b(?:hi|hello) (?P<name>\w+)")
+    engine.register('classed', r"[|]pipe (?P<word>\w+)")
+    assert engine.match("the forecast tomorrow") == ('forecast', {'when': 'tomorrow'})
+    assert engine.match("hello Bob") == ('grouped', {'name': 'Bob'})
+    assert engine.match("|pipe dream") == ('classed', {'word': 'dream'})
+
+def test_scan_finds_overlapping_matches():
+    engine = GrammarEngine()
+    engine.register('location', r"\bin\s(?P<location>[\w\s]+)[\?]")
+    engine.register('time', r"(?P<time>tomorrow|tonight)")
+    assert engine.scan("weather in London tomorrow?") == {
+        'location': {'location': 'London tomorrow'},
+        'time': {'time': 'tomorrow'},
+    }
+
+def test_lists_context_extraction():
+    context = Context(log)
+    context.extract_from_input("Could you add oat milk to my shopping list")
+    assert (context.action, context.item, context.list) == ('add', 'oat milk', 'shopping')
+
+    context = Context(log)
+    context.extract_from_input("create me a new list called 'camping'")
+    assert (context.action, context.list) == ('create', 'camping')
+
+def test_extract_search_term():
+    assert extract_search_term("download me the movie Iron Man") == "Iron Man"
+    assert extract_search_term("tell me a joke") is None
@@ -0,0 +1,27 @@
+from atlas.intent_index import IntentIndex, normalize_phrase
+
+
+def test_normalize_phrase():
+    assert normalize_phrase("Add Milk, to my LIST!") == " add milk to my list "
+
+def test_search_scores_every_target_in_one_pass():
+    index = IntentIndex()
+    index.add("list", "lists")
+    index.add("download", "movies")
+    index.add("download the movie", "movies")
+    index.add("weather", "weather", weight=5)
+    assert index.search("Download the movie Alien and add it to my list") == {"movies": 4, "lists": 1}
+    assert index.search("what's the weather like") == {"weather": 5}
+
+def test_overlapping_phrases_are_all_found():
+    index = IntentIndex()
+    index.add("the movie", "a")
+    index.add("movie night", "b")
+    index.add("night", "c")
+    assert index.search("the movie night") == {"a": 2, "b": 2, "c": 1}
+
+def test_partial_words_do_not_match():
+    index = IntentIndex()
+    index.add("list", "lists")
+    index.add("he", "pronoun")
+    assert index.search("the playlist is listed") == {}
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from loguru import logger as log
+from atlas.listener import Listener
+from atlas.stt import LocalSTTBackend
+
+
+def _recognize_all(backend, utterances, expected=None, stt_workers=3):
+    async def _run():
+        listener = Listener(log, stt_backend=backend, stt_workers=stt_workers)
+        listener.loop = asyncio.get_running_loop()
+        for _ in range(utterances):
+            now = time.monotonic()
+            listener.submit_recognition(None, now, now)
+        events = [await asyncio.wait_for(listener.get_speech_event_async(), 1) for _ in range(expected or utterances)]
+        listener.stt_pool.shutdown()
+        return events
+
+    return asyncio.run(_run())
+
+
+def test_transcripts_delivered_in_capture_order():
+    # Earlier utterances take longer to recognize than later ones
+    delays = {"first": 0.06, "second": 0.03, "third": 0}
+    backend = LocalSTTBackend(["first", "second", "third"], delay=lambda text: delays[text])
+    events = _recognize_all(backend, 3)
+    assert [event.text for event in events] == ["first", "second", "third"]
+
+def test_events_carry_timings():
+    events = _recognize_all(LocalSTTBackend(["hello"], delay=0.01), 1)
+    timings = events[0].timings()
+    assert timings["recognition"] >= 0.01
+    assert set(timings) == {"speech", "queued", "recognition"}
+
+def test_unrecognized_utterances_are_dropped():
+    backend = LocalSTTBackend([None, "hello"])
+    events = _recognize_all(backend, 2, expected=1)
+    assert [event.text for event in events] == ["hello"]
+
+def test_saved_calibration_is_only_rewritten_once_it_drifts(tmp_path):
+    class Source:
+        SAMPLE_RATE = 16000
+
+    listener = Listener(log, stt_backend=LocalSTTBackend([]))
+    listener.calibration_path = str(tmp_path / "noise_calibration.json")
+    (tmp_path / "noise_calibration.json").write_text('{"energy_threshold": 300}')
+    listener._calibrate(Source())
+    assert listener.saved_energy_threshold == 300
+
+    listener.vad.energy_threshold = 310
+    listener._save_calibration_if_drifted()
+    assert (tmp_path / "noise_calibration.json").read_text() == '{"energy_threshold": 300}'
+
+    listener.vad.energy_threshold = 600
+    listener._save_calibration_if_drifted()
+    assert '"energy_threshold": 600' in (tmp_path / "noise_calibration.json").read_text()
+    listener.stt_pool.shutdown()
@@ -0,0 +1,75 @@
+from loguru import logger as log
+from atlas.extensions.lists.ext.lists_ext import ListExtension
+from atlas.extensions.lists.ext.lists_index import ItemIndex, normalize_key
+from atlas.extensions.lists.ext.lists_store import Store
+
+
+def test_normalize_key_folds_case_punctuation_and_plurals():
+    assert normalize_key("Milk.") == normalize_key("milks") == "milk"
+    assert normalize_key("Dog  Food!") == "dog food"
+    assert normalize_key("Cherries") == "cherry"
+    assert normalize_key("Boxes") == "box"
+    assert normalize_key("glass") == "glass"
+
+def test_exact_lookup_by_key():
+    index = ItemIndex(["Milk", "toothpaste", "toothpaste"])
+    assert "milk." in index
+    assert index.get("MILKS") == "Milk"
+    assert index.get("bread") is None
+    index.remove("toothpaste")
+    assert "toothpaste" in index
+    index.remove("toothpaste")
+    assert "toothpaste" not in index
+    assert len(index) == 1
+
+def test_approximate_lookup_for_near_misses():
+    index = ItemIndex(["toothpaste", "dog food", "sponges"])
+    assert index.closest("tooth paste") == "toothpaste"
+    assert index.resolve("dogfood") == "dog food"
+    assert index.resolve("silk") is None
+
+def test_extension_resolves_items_and_list_names(tmp_path):
+    store = Store(log, store_file_name=str(tmp_path / 'store.json'))
+    store.create_list('shopping')
+    store.add_item('shopping', 'Milk')
+    store.add_item('shopping', 'toothpaste')
+    extension = ListExtension(log, store=store)
+
+    response = extension.process_voice_input('remove milk. from the Shopping list')
+    assert response.text == "I've removed Milk from the shopping list."
+    response = extension.process_voice_input('remove tooth paste from the shopping list')
+    assert response.text == "I couldn't find tooth paste on the shopping list. Did you mean toothpaste?"
+    assert extension.is_in_conversation()
+    response = extension.process_follow_up_input('yes please')
+    assert response.text == "I've removed toothpaste from the shopping list."
+    assert store.get_items('shopping') == []
+
+def test_near_misses_are_only_removed_once_confirmed(tmp_path):
+    store = Store(log, store_file_name=str(tmp_path / 'store.json'))
+    store.create_list('shopping')
+    store.add_item('shopping', 'milk')
+    extension = ListExtension(log, store=store)
+
+    response = extension.process_voice_input('remove oat milk from the shopping list')
+    assert response.text == "I couldn't find oat milk on the shopping list. Did you mean milk?"
+    response = extension.process_follow_up_input('no')
+    assert response.text == "Okay, I've left it as it is."
+    assert not extension.is_in_conversation()
+    assert store.get_items('shopping') == ['milk']
+
+    response = extension.process_voice_input('delete the shoping list')
+    assert response.text == "You don't have a shoping list. Did you mean the shopping list?"
+    assert extension.process_follow_up_input('yes').text == "I've deleted the shopping list."
+    assert not store.has_list('shopping')
+
+def test_instances_sharing_a_store_see_each_others_changes(tmp_path):
+    from atlas.extensions.lists.ext.lists_store import SQLiteStore
+    def _store():
+        return SQLiteStore(log, db_file_name=str(tmp_path / 'store.db'), json_file_name=str(tmp_path / 'store.json'))
+    first, second = ListExtension(log, store=_store()), ListExtension(log, store=_store())
+
+    assert first.process_voice_input('create a list called shopping').text == "I've created the shopping list."
+    # Both were created before the list, and before anything was on it
+    assert second.process_voice_input('add eggs to the Shopping list').text == "I've added eggs to the shopping list."
+    assert first.process_voice_input('remove Eggs. from the shopping list').text == "I've removed eggs from the shopping list."
+    assert second.store.get_items('shopping') == []
@@ -0,0 +1,78 @@
+import json
+import sqlite3
+import pytest
+from loguru import logger as log
+from atlas.extensions.lists.ext.lists_ext import ListExtension
+from atlas.extensions.lists.ext.lists_store import Store, SQLiteStore
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'json':
+        store = Store(log, store_file_name=str(tmp_path / 'store.json'))
+    else:
+        store = SQLiteStore(log, db_file_name=str(tmp_path / 'store.db'), json_file_name=str(tmp_path / 'store.json'))
+    yield store
+    store.close()
+
+def test_store_operations(store):
+    assert store.create_list('shopping')
+    assert not store.create_list('shopping')
+    assert store.add_item('shopping', 'milk')
+    assert store.add_item('shopping', 'eggs')
+    assert store.add_item('shopping', 'milk')
+    assert not store.add_item('holiday', 'Scotland')
+
+    assert store.remove_item('shopping', 'milk')
+    assert not store.remove_item('shopping', 'bread')
+    assert store.get_items('shopping') == ['eggs', 'milk']
+    assert store.get_items('holiday') is None
+    assert store.list_names() == ['shopping']
+
+    assert store.remove_list('shopping')
+    assert not store.has_list('shopping')
+
+def test_lists_extension_uses_the_store(store):
+    extension = ListExtension(log, store=store)
+    assert extension.process_voice_input('create the list shopping').text == "I've created the shopping list."
+    assert extension.process_voice_input('add milk to my shopping list').text == "I've added milk to the shopping list."
+    assert extension.process_voice_input('remove bread from the shopping list').text == "I couldn't find bread on the shopping list."
+    assert extension.process_voice_input('read me the shopping list').text == "On the shopping list you have milk."
+
+def test_sqlite_store_migrates_the_json_store_once(tmp_path):
+    with open(tmp_path / 'store.json', 'w') as f:
+        json.dump({'shopping': ['toothpaste', 'dog food', 'toothpaste'], 'places to visit': []}, f)
+
+    def _open():
+        return SQLiteStore(log, db_file_name=str(tmp_path / 'store.db'), json_file_name=str(tmp_path / 'store.json'))
+
+    store = _open()
+    assert store.get_items('shopping') == ['toothpaste', 'dog food', 'toothpaste']
+    assert store.get_items('places to visit') == []
+    store.remove_list('places to visit')
+    store.close()
+
+    store = _open()
+    assert store.list_names() == ['shopping']
+    assert store.connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    store.close()
+
+def test_sqlite_transaction_commits_once_and_rolls_back_on_error(tmp_path):
+    store = SQLiteStore(log, db_file_name=str(tmp_path / 'store.db'), json_file_name=str(tmp_path / 'missing.json'))
+    other = sqlite3.connect(tmp_path / 'store.db')
+
+    with store.transaction():
+        store.create_list('shopping')
+        store.add_item('shopping', 'milk')
+        # Not visible to other connections until the transaction commits
+        assert other.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    assert other.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.add_item('shopping', 'eggs')
+            raise RuntimeError()
+    assert store.get_items('shopping') == ['milk']
+
+    other.close()
+    store.close()
@@ -0,0 +1,109 @@
+import asyncio
+import random
+from loguru import logger as log
+from atlas.openai_api_client import APIClient, SentenceSegmenter
+
+
+class StubAPIClient(APIClient):
+    def __init__(self):
+        super().__init__(log)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _speech_request(self, chunk, model, voice, response_format):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(random.uniform(0, 0.01))
+        self.in_flight -= 1
+        return f"clip-{chunk}"
+
+
+async def _collect(clip_gen):
+    return [clip async for clip in clip_gen]
+
+
+def test_feed_releases_sentence_once_complete():
+    segmenter = SentenceSegmenter(log)
+    assert segmenter.feed("Hello Nick") == []
+    assert segmenter.feed(".") == []
+    assert segmenter.feed(" It is") == ["Hello Nick."]
+    assert segmenter.feed(" sunny. ") == ["It is sunny."]
+    assert segmenter.flush() == []
+
+def test_feed_waits_for_whitespace_after_punctuation():
+    segmenter = SentenceSegmenter(log)
+    assert segmenter.feed("It is 3.") == []
+    assert segmenter.feed("5 degrees.") == []
+    assert segmenter.flush() == ["It is 3.5 degrees."]
+
+def test_feed_splits_run_on_sentence_early():
+    segmenter = SentenceSegmenter(log, max_chunk_size=20)
+    chunks = segmenter.feed("one two three four five six seven")
+    assert chunks
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks + segmenter.flush()) == "one two three four five six seven"
+
+def test_text_accumulates_full_reply():
+    segmenter = SentenceSegmenter(log)
+    for delta in ["Done", ". Anything", " else?"]:
+        segmenter.feed(delta)
+    assert segmenter.text == "Done. Anything else?"
+    assert segmenter.flush() == ["Anything else?"]
+
+def test_split_without_break_point_does_not_loop():
+    segmenter = SentenceSegmenter(log, max_chunk_size=5)
+    assert segmenter.feed("abcdefghijkl") == ["abcde", "fghij"]
+    assert segmenter.flush() == ["kl"]
+
+def test_audio_speech_yields_clips_in_chunk_order():
+    client = StubAPIClient()
+    chunks = [str(i) for i in range(10)]
+    clips = asyncio.run(_collect(client.v1_audio_speech_async(chunks, concurrency=4)))
+    assert clips == [f"clip-{chunk}" for chunk in chunks]
+    assert 1 < client.max_in_flight <= 4
+
+def test_audio_speech_sequential_by_default():
+    client = StubAPIClient()
+    asyncio.run(_collect(client.v1_audio_speech_async(["a", "b", "c"])))
+    assert client.max_in_flight == 1
+
+def test_abandoned_audio_speech_closes_streamed_source():
+    closed = []
+
+    async def _chunks():
+        try:
+            for i in range(100):
+                await asyncio.sleep(0)
+                yield str(i)
+        finally:
+            closed.append(True)
+
+    async def run():
+        clip_gen = StubAPIClient().v1_audio_speech_async(_chunks(), concurrency=2)
+        assert await clip_gen.__anext__() == "clip-0"
+        await clip_gen.aclose()
+        # Let the cancelled scheduler finish
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert closed == [True]
+
+def test_audio_speech_holds_no_more_clips_than_its_concurrency():
+    client = StubAPIClient()
+    started = []
+
+    async def _speech_request(chunk, model, voice, response_format):
+        started.append(chunk)
+        return f"clip-{chunk}"
+    client._speech_request = _speech_request
+
+    async def run():
+        clip_gen = client.v1_audio_speech_async([str(i) for i in range(10)], concurrency=2)
+        assert await clip_gen.__anext__() == "clip-0"
+        # While the consumer holds the first clip, only one more may be requested
+        await asyncio.sleep(0.01)
+        requested = list(started)
+        await clip_gen.aclose()
+        return requested
+
+    assert asyncio.run(run()) == ["0", "1"]
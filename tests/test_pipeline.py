@@ -0,0 +1,63 @@
+import asyncio
+import os
+import pytest
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+from benchmarks.bench_pipeline import measure
+from benchmarks.stand_ins import StandIns
+
+
+def test_turns_run_end_to_end_against_the_stand_ins():
+    async def run():
+        stand_ins = StandIns(chat_latency=0.01, token_interval=0.001, speech_latency=0.01, clip_seconds=0.05,
+                             radarr_latency=0, weather_latency=0, jitter=0.005)
+        await stand_ins.start()
+        try:
+            return await measure(stand_ins, turns=3, warmup_turns=0, stream_completions=True, tts_concurrency=2), stand_ins
+        except RuntimeError as e:
+            pytest.skip(str(e))
+        finally:
+            await stand_ins.close()
+
+    results, stand_ins = asyncio.run(run())
+    pygame.mixer.quit()
+    assert results["turns"] == 3
+    assert results["spans"]["time_to_first_audio"]["samples"] == 3
+    assert results["spans"]["turn"]["p50"] >= results["spans"]["time_to_first_audio"]["p50"]
+    assert stand_ins.requests["/v1/chat/completions"] >= 3
+    assert stand_ins.requests["/data/2.5/forecast"] == 1
+    # measure leaves the environment as it found it
+    assert "ATLAS__OPENAI_BASE_URL" not in os.environ
+
+class FailingSummaryChat:
+    def build_summary_request(self):
+        return [{"role": "system", "content": "summarize"}], 10
+
+
+class FailingAPIClient:
+    async def v1_chat_completions_async(self, messages):
+        raise ConnectionResetError("connection reset")
+
+
+def test_failed_summary_refresh_is_logged_and_closed():
+    from loguru import logger as log
+    from atlas.pipeline import TurnPipeline
+
+    errors = []
+
+    async def run():
+        pipeline = TurnPipeline(log, FailingAPIClient(), None, FailingSummaryChat(), None, None, None, full_duplex=False)
+        pipeline.summary_task = asyncio.create_task(pipeline._refresh_summary())
+        await asyncio.sleep(0)
+        await pipeline.close()
+        return pipeline
+
+    handler = log.add(lambda message: errors.append(message), level="ERROR")
+    try:
+        pipeline = asyncio.run(run())
+    finally:
+        log.remove(handler)
+    assert pipeline.summary_task is None
+    assert any("connection reset" in error for error in errors)
@@ -0,0 +1,83 @@
+import json
+import os
+from loguru import logger as log
+from requests import Response
+from requests.adapters import BaseAdapter
+from atlas.extensions.radarr.ext.radarr_api import RadarrAPI
+
+EXAMPLE_MOVIE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example-response.json')
+
+with open(EXAMPLE_MOVIE_PATH, 'r') as f:
+    LOOKUP_RESULT = json.load(f)
+
+
+class FakeRadarr(BaseAdapter):
+    """
+    Transport adapter standing in for a Radarr host, recording every request sent.
+    """
+
+    def __init__(self, add_status=201):
+        super().__init__()
+        self.add_status = add_status
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = Response()
+        response.request = request
+        response.url = request.url
+        if request.method == 'GET':
+            response.status_code = 200
+            response._content = json.dumps([LOOKUP_RESULT]).encode()
+        else:
+            response.status_code = self.add_status
+            response._content = b'{}'
+        return response
+
+    def close(self):
+        pass
+
+
+def _api(adapter, cache_ttl=300):
+    api = RadarrAPI('http://radarr.local', 'key', log, cache_ttl=cache_ttl)
+    api.session.mount('http://', adapter)
+    return api
+
+def test_lookups_are_cached_by_normalized_term():
+    adapter = FakeRadarr()
+    api = _api(adapter)
+    movie, _ = api.search_top_match('Extraction')
+    assert movie['title'] == 'Extraction'
+    assert api.search_top_match('  extraction!') == (movie, None)
+    assert len(adapter.requests) == 1
+    assert adapter.requests[0].headers['X-Api-Key'] == 'key'
+
+def test_expired_lookups_are_repeated():
+    adapter = FakeRadarr()
+    api = _api(adapter, cache_ttl=0)
+    api.search_top_match('Extraction')
+    api.search_top_match('Extraction')
+    assert len(adapter.requests) == 2
+
+def test_successful_download_invalidates_the_lookup():
+    adapter = FakeRadarr()
+    api = _api(adapter)
+    movie, _ = api.search_top_match('Extraction')
+    assert 'Extraction' in api.download_movie(movie)
+    api.search_top_match('Extraction')
+    assert [request.method for request in adapter.requests] == ['GET', 'POST', 'GET']
+
+def test_failed_download_keeps_the_lookup():
+    adapter = FakeRadarr(add_status=400)
+    api = _api(adapter)
+    movie, _ = api.search_top_match('Extraction')
+    assert 'went wrong' in api.download_movie(movie)
+    api.search_top_match('Extraction')
+    assert len(adapter.requests) == 2
+
+def test_extension_reads_its_settings_when_constructed(monkeypatch):
+    from atlas.extensions.radarr.ext.radarr_ext import RadarrExtension
+    monkeypatch.setenv('RADARR_EXT__BASE_URL', 'http://127.0.0.1:1')
+    assert RadarrExtension(log).radarr_api.base_url == 'http://127.0.0.1:1'
+    monkeypatch.setenv('RADARR_EXT__BASE_URL', 'http://127.0.0.1:2')
+    assert RadarrExtension(log).radarr_api.base_url == 'http://127.0.0.1:2'
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from loguru import logger as log
+from atlas.speculation import SpeculativeCompletion, SpeculationMetrics
+
+
+async def _deltas(closed, fail=False):
+    try:
+        for delta in ["Hello", " there", "."]:
+            await asyncio.sleep(0.01)
+            yield delta
+        if fail:
+            raise ConnectionError("stream dropped")
+        await asyncio.sleep(10)
+    finally:
+        closed.append(True)
+
+def test_kept_speculation_replays_prefetched_deltas():
+    async def run():
+        closed = []
+        speculation = SpeculativeCompletion(log, _deltas(closed, fail=True))
+        # Routing takes longer than the first deltas
+        await asyncio.sleep(0.05)
+        assert speculation.queue.qsize() >= 3
+        received = []
+        with pytest.raises(ConnectionError):
+            async for delta in speculation.deltas():
+                received.append(delta)
+        return received, closed
+
+    received, closed = asyncio.run(run())
+    assert received == ["Hello", " there", "."]
+    assert closed == [True]
+
+def test_discarded_speculation_closes_the_stream():
+    async def run():
+        closed = []
+        speculation = SpeculativeCompletion(log, _deltas(closed))
+        await asyncio.sleep(0.015)
+        await speculation.cancel()
+        return speculation, closed
+
+    speculation, closed = asyncio.run(run())
+    assert speculation.task.cancelled()
+    assert closed == [True]
+
+def test_metrics_keep_rate():
+    metrics = SpeculationMetrics()
+    assert metrics.keep_rate == 0.0
+    metrics.record(kept=True)
+    metrics.record(kept=True)
+    metrics.record(kept=False)
+    assert str(metrics) == "2 kept, 1 discarded (67% kept)"
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from loguru import logger as log
+from atlas.startup import StartupOrchestrator
+
+
+def test_components_start_concurrently():
+    async def slow_async():
+        await asyncio.sleep(0.2)
+
+    def slow_sync():
+        time.sleep(0.2)
+
+    async def run():
+        startup = StartupOrchestrator(log)
+        startup.add("api client", slow_async).add("listener", slow_sync).add("mixer", slow_sync)
+        started_at = time.monotonic()
+        readiness = await startup.run()
+        return readiness, time.monotonic() - started_at
+
+    readiness, elapsed = asyncio.run(run())
+    assert set(readiness) == {"api client", "listener", "mixer"}
+    assert elapsed < 0.5
+
+def test_failed_component_does_not_stop_the_others():
+    def broken():
+        raise RuntimeError("no microphone")
+
+    async def run():
+        startup = StartupOrchestrator(log)
+        startup.add("listener", broken).add("mixer", lambda: None)
+        await startup.run()
+        return startup
+
+    startup = asyncio.run(run())
+    assert list(startup.readiness) == ["mixer"]
+    assert isinstance(startup.failures["listener"], RuntimeError)
+    assert startup._describe(startup.components).startswith("listener failed, mixer ")
+
+def test_background_components_are_not_waited_for():
+    async def run():
+        prewarmed = asyncio.Event()
+
+        async def prewarm():
+            await asyncio.sleep(0.05)
+            prewarmed.set()
+
+        startup = StartupOrchestrator(log)
+        startup.add("mixer", lambda: None).add("extensions", prewarm, background=True)
+        readiness = dict(await startup.run())
+        await asyncio.wait_for(prewarmed.wait(), 1)
+        await asyncio.sleep(0)
+        return readiness, startup
+
+    readiness, startup = asyncio.run(run())
+    assert "extensions" not in readiness
+    assert "extensions" in startup.readiness
+    assert not startup.background_tasks
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import socket
+import aiohttp
+from loguru import logger as log
+from atlas.audio_clip import AudioClip
+from atlas.listener import SpeechEvent
+from atlas.tracing import Histogram, LatencyTracer
+
+
+def _traced_turn(tracer):
+    event = SpeechEvent(speech_started_at=10.0, speech_ended_at=12.0)
+    event.recognized_at = 12.5
+    trace = tracer.start(event)
+    trace.mark("routed", 12.6)
+    trace.mark("llm_first_token", 13.0)
+    trace.mark("llm_first_token", 13.5)
+
+    clip = AudioClip(b"audio", text="Hello.")
+    clip.requested_at, clip.first_byte_at, clip.started_at = 13.1, 13.3, 13.4
+    trace.add_clip(clip)
+    trace.add_clip(AudioClip(b"audio", text="Again."))
+    return trace
+
+def test_turn_spans_come_from_the_first_mark_of_each_stage(tmp_path):
+    tracer = LatencyTracer(log, trace_file=str(tmp_path / "traces.jsonl"), metrics_file=str(tmp_path / "atlas.prom"))
+    trace = _traced_turn(tracer)
+    tracer.finish(trace)
+    # Exported on the writer thread
+    tracer.flush()
+
+    spans = trace.spans()
+    assert round(spans["stt"], 3) == 0.5
+    assert round(spans["llm_first_token"], 3) == 0.4
+    assert round(spans["tts_first_byte"], 3) == 0.2
+    assert round(spans["time_to_first_audio"], 3) == 1.4
+
+    logged = json.loads((tmp_path / "traces.jsonl").read_text())
+    assert logged["event_id"] == str(trace.event_id)
+    assert logged["stages"]["speech_start"] == 0.0
+    metrics = (tmp_path / "atlas.prom").read_text()
+    assert 'atlas_turn_stage_seconds_bucket{stage="time_to_first_audio",le="1.5"} 1' in metrics
+    assert 'atlas_turn_stage_seconds_count{stage="stt"} 1' in metrics
+
+def test_interrupted_turns_are_left_out_of_whole_turn_spans():
+    tracer = LatencyTracer(log)
+    trace = _traced_turn(tracer)
+    trace.interrupted = True
+    tracer.finish(trace)
+    assert tracer.histograms["turn"].count == 0
+    assert tracer.histograms["time_to_first_audio"].count == 0
+    assert tracer.histograms["stt"].count == 1
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram(buckets=(1.0, 2.0))
+    assert histogram.quantile(0.5) is None
+    for value in (0.5, 1.5, 1.5, 1.5):
+        histogram.observe(value)
+    assert histogram.quantile(0.25) == 1.0
+    assert round(histogram.quantile(0.5), 3) == 1.333
+    histogram.observe(5.0)
+    assert histogram.quantile(1.0) == 2.0
+
+def test_metrics_are_served_over_http():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    async def run():
+        tracer = LatencyTracer(log, metrics_port=port)
+        tracer.finish(_traced_turn(tracer))
+        await tracer.serve_metrics()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    return response.status, await response.text()
+        finally:
+            await tracer.close()
+
+    status, text = asyncio.run(run())
+    assert status == 200
+    assert "# TYPE atlas_turn_stage_seconds histogram" in text
@@ -0,0 +1,47 @@
+import asyncio
+from loguru import logger as log
+from atlas.tts_cache import ClipCache
+
+
+def test_key_depends_on_every_speech_parameter():
+    key = ClipCache.key("Done.", "tts-1", "echo", "mp3")
+    assert key == ClipCache.key("Done.", "tts-1", "echo", "mp3")
+    assert key != ClipCache.key("Done.", "tts-1", "alloy", "mp3")
+    assert key != ClipCache.key("Done.", "tts-1", "echo", "opus")
+
+def test_memory_hit_then_disk_hit_after_eviction(tmp_path):
+    async def _run():
+        cache = ClipCache(log, cache_dir=str(tmp_path), memory_max_bytes=10, disk_max_bytes=100)
+        cache.put("a", b"aaaaaa")
+        cache.put("b", b"bbbbbb")
+        await cache.flush()
+        # "a" no longer fits in memory next to "b", but is still on disk
+        assert await cache.get("b") == b"bbbbbb"
+        assert await cache.get("a") == b"aaaaaa"
+        assert await cache.get("c") is None
+        return cache.stats()
+
+    stats = asyncio.run(_run())
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    async def _run():
+        cache = ClipCache(log, cache_dir=str(tmp_path), memory_max_bytes=0, disk_max_bytes=10)
+        for key in ["a", "b", "c"]:
+            cache.put(key, key.encode() * 4)
+            await cache.flush()
+        return cache
+
+    cache = asyncio.run(_run())
+    assert list(cache.disk) == ["b", "c"]
+    assert cache.disk_size == 8
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b", "c"]
+
+def test_disk_tier_survives_restart(tmp_path):
+    async def _run():
+        cache = ClipCache(log, cache_dir=str(tmp_path))
+        cache.put("a", b"audio")
+        await cache.flush()
+        return await ClipCache(log, cache_dir=str(tmp_path)).get("a")
+
+    assert asyncio.run(_run()) == b"audio"
@@ -0,0 +1,40 @@
+import os
+from atlas.vad import VoiceActivityDetector, read_wav_frames
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vad")
+
+
+def _run(path, **kwargs):
+    sample_rate, frames = read_wav_frames(os.path.join(FIXTURES, path))
+    vad = VoiceActivityDetector(sample_rate, **kwargs)
+    # The first 300 ms of every fixture is ambient noise
+    vad.calibrate(frames[:10])
+    utterances = []
+    for index, frame in enumerate(frames[10:], start=10):
+        utterance = vad.process(frame)
+        if utterance:
+            utterances.append((index, utterance))
+    return vad, frames, utterances
+
+
+def test_detects_single_utterance():
+    vad, _, utterances = _run("speech.wav")
+    assert len(utterances) == 1
+
+def test_endpoints_after_trailing_silence():
+    vad, frames, utterances = _run("speech.wav", trailing_silence_ms=300)
+    ended_at, _ = utterances[0]
+    # Speech stops at 1.8s; the utterance must end well before the 3.3s recording does
+    speech_end = 1800 // vad.frame_ms
+    assert speech_end <= ended_at <= speech_end + 300 // vad.frame_ms + 2
+    assert ended_at < len(frames) - 1
+
+def test_utterance_includes_pre_roll():
+    vad, _, utterances = _run("speech.wav")
+    _, utterance = utterances[0]
+    # 1.2s of speech, plus at least part of the pre-roll and trailing silence
+    assert len(utterance) > 1.2 * vad.sample_rate * 2
+
+def test_drops_noise_and_short_bursts():
+    _, _, utterances = _run("noise.wav")
+    assert utterances == []
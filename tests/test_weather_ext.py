@@ -0,0 +1,124 @@
+import asyncio
+import datetime
+from loguru import logger as log
+from atlas.extensions.weather.ext.weather_ext import WeatherExtension, ForecastSeries
+
+
+def _forecast(dt, temp):
+    return {
+        'dt': dt,
+        'main': {'temp': temp, 'humidity': 80},
+        'weather': [{'description': 'light rain'}],
+        'wind': {'speed': 3, 'deg': 180},
+        'clouds': {'all': 90},
+    }
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.status = 200
+        self.data = data
+
+    async def json(self):
+        return self.data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeOpenWeather:
+    """
+    Stands in for the shared HTTP client, serving a forecast every three hours from now.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append(params)
+        now = int(datetime.datetime.now().timestamp())
+        return FakeResponse({'list': [_forecast(now + i * 3 * 3600, i) for i in range(params['cnt'])]})
+
+
+def _extension():
+    extension = WeatherExtension(log)
+    extension.http = FakeOpenWeather()
+    return extension
+
+def test_forecasts_are_cached_per_location():
+    extension = _extension()
+
+    async def ask():
+        now = await extension.get_forecast('Leeds', 0)
+        tomorrow = await extension.get_forecast('  leeds ', 24)
+        return now, tomorrow
+
+    now, tomorrow = asyncio.run(ask())
+    assert "'temperature': 0" in now
+    assert "'temperature': 8" in tomorrow
+    assert len(extension.http.requests) == 1
+    assert extension.http.requests[0]['cnt'] == 16
+
+def test_forecasts_further_ahead_are_refetched_with_more_intervals():
+    extension = _extension()
+
+    async def ask():
+        await extension.get_forecast('Leeds', 0)
+        return await extension.get_forecast('Leeds', 90)
+
+    assert "'temperature': 30" in asyncio.run(ask())
+    assert [params['cnt'] for params in extension.http.requests] == [16, 31]
+
+def test_series_looks_up_the_nearest_interval():
+    series = ForecastSeries([0, 10800, 21600], ['a', 'b', 'c'], expires_at=100)
+    assert series.at(-100) == 'a'
+    assert series.at(5000) == 'a'
+    assert series.at(6000) == 'b'
+    assert series.at(21600 + 5000) == 'c'
+    assert series.at(21600 + 6000) is None
+    assert series.covers(21600, now=0)
+    assert not series.covers(21600, now=100)
+
+def test_times_are_parsed_off_the_event_loop(monkeypatch):
+    from atlas.extensions.weather.ext import weather_ext
+    parsed_on = []
+
+    def parse(time, settings=None):
+        # Raises on an executor thread, which has no running loop
+        try:
+            asyncio.get_running_loop()
+            parsed_on.append("event loop")
+        except RuntimeError:
+            parsed_on.append("executor")
+        return datetime.datetime.now()
+    monkeypatch.setattr(weather_ext.dateparser, "parse", parse)
+
+    response = asyncio.run(_extension().process_voice_input("what is the weather in Leeds tomorrow?"))
+    assert "Here is the weather data" in response
+    assert parsed_on == ["executor"]
+
+def test_times_of_day_are_answered_without_dateparser(monkeypatch):
+    from atlas.extensions.weather.ext import weather_ext
+
+    def parse(time, settings=None):
+        raise AssertionError(f"dateparser was asked to parse '{time}'")
+    monkeypatch.setattr(weather_ext.dateparser, "parse", parse)
+
+    extension = _extension()
+
+    async def ask():
+        return [await extension.process_voice_input(f"what is the weather {time}") for time in ("tonight", "this evening", "later")]
+
+    for response in asyncio.run(ask()):
+        assert "Here is the weather data" in response
+    assert len(extension.http.requests) == 1
+
+def test_unparsed_times_fall_back_to_now(monkeypatch):
+    from atlas.extensions.weather.ext import weather_ext
+    monkeypatch.setattr(weather_ext.dateparser, "parse", lambda time, settings=None: None)
+
+    response = asyncio.run(_extension().process_voice_input("what is the weather on monday"))
+    assert "'temperature': 0" in response